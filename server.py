@@ -1,16 +1,26 @@
+import atexit
+import copy
 import io
-import json
+import itertools
 import os
+import re
+import threading
 import time
-from typing import Any, Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from fastmcp import FastMCP
 from fastmcp.utilities.types import Image
-from PIL import Image as PILImage
 
 from utils.config_utils import get_robot_specifications, parse_robot_config
 from utils.network_utils import ping_ip_and_port
-from utils.websocket_manager import WebSocketManager, parse_image, parse_json
+from utils.websocket_manager import (
+    WebSocketManager,
+    dump_json,
+    parse_image,
+    parse_json,
+    topic_frame_filter,
+)
 
 # ROS bridge connection settings
 ROSBRIDGE_IP = "127.0.0.1"  # Default is localhost. Replace with your local IPor set using the LLM.
@@ -36,6 +46,149 @@ mcp = FastMCP("ros-mcp-server")
 ws_manager = WebSocketManager(
     ROSBRIDGE_IP, ROSBRIDGE_PORT, default_timeout=5.0
 )  # Increased default timeout for ROS operations
+# The rosbridge connection is opened lazily and reused across tool calls; close it on shutdown
+atexit.register(ws_manager.close)
+
+
+def _rosapi_template(service: str, service_type: str) -> dict:
+    """Build the constant part of a rosapi service call; callers add their own "args" and "id"."""
+    return {"op": "call_service", "service": f"/rosapi/{service}", "type": f"rosapi/{service_type}"}
+
+
+_TOPICS_TEMPLATE = _rosapi_template("topics", "Topics")
+_TOPIC_TYPE_TEMPLATE = _rosapi_template("topic_type", "TopicType")
+_MESSAGE_DETAILS_TEMPLATE = _rosapi_template("message_details", "MessageDetails")
+_PUBLISHERS_TEMPLATE = _rosapi_template("publishers", "Publishers")
+_SUBSCRIBERS_TEMPLATE = _rosapi_template("subscribers", "Subscribers")
+_SERVICES_TEMPLATE = _rosapi_template("services", "Services")
+_SERVICE_TYPE_TEMPLATE = _rosapi_template("service_type", "ServiceType")
+_SERVICE_REQUEST_DETAILS_TEMPLATE = _rosapi_template(
+    "service_request_details", "ServiceRequestDetails"
+)
+_SERVICE_RESPONSE_DETAILS_TEMPLATE = _rosapi_template(
+    "service_response_details", "ServiceResponseDetails"
+)
+_SERVICE_PROVIDERS_TEMPLATE = _rosapi_template("service_providers", "ServiceProviders")
+
+# Topic and service names: optionally absolute ("/") or private ("~" or "~/"), "/"-separated
+# tokens of letters, digits and underscores, the first not starting with a digit. Checked
+# locally so a malformed name fails fast instead of costing a rosbridge round trip (or a full
+# timeout)
+_ROS_NAME_RE = re.compile(r"(?:/|~/?)?[A-Za-z_][A-Za-z0-9_]*(?:/[A-Za-z0-9_]+)*")
+
+# Request ids only need to be unique on the connection; a process-wide counter also keeps a
+# late reply to a timed-out request from being mistaken for the answer to a repeat of it
+_REQUEST_IDS = itertools.count(1)
+
+
+def _mk_id(prefix: str) -> str:
+    """Build a unique rosbridge request id with a readable prefix."""
+    return f"{prefix}_{next(_REQUEST_IDS)}"
+
+
+def _service_values(response: Optional[dict]) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Unwrap a rosapi service response in a single pass.
+
+    Returns:
+        tuple: (values, error)
+            - (values dict, None) if the call succeeded
+            - (None, "Service call failed: <reason>") if rosbridge reported a failure
+            - (None, None) if there is no response or it carries no values
+    """
+    if not response:
+        return None, None
+    values = response.get("values")
+    if "result" in response and not response["result"]:
+        # Rosbridge reports the failure reason either as a plain string or under "message"
+        if isinstance(values, dict):
+            reason = values.get("message", "Service call failed")
+        else:
+            reason = values or "Service call failed"
+        return None, f"Service call failed: {reason}"
+    if not isinstance(values, dict):
+        return None, None
+    return values, None
+
+
+def _typedef_to_fields(typedef: dict) -> dict:
+    """Turn a rosapi typedef into {"fields": {name: type}, "field_count": n}."""
+    fields = dict(zip(typedef.get("fieldnames", []), typedef.get("fieldtypes", [])))
+    return {"fields": fields, "field_count": len(fields)}
+
+
+# Message definitions do not change while connected to a robot, so get_message_details keeps
+# an LRU cache of its results (message type -> result). Cleared on connect_to_robot.
+_MSG_DETAIL_CACHE: "OrderedDict[str, dict]" = OrderedDict()
+_MSG_DETAIL_CACHE_SIZE = 512
+_MSG_DETAIL_LOCK = threading.Lock()
+
+# The ROS graph (topic and service lists, their types, publishers, subscribers and providers)
+# changes only when nodes come and go, but clients ask the same questions over and over.
+# Successful responses to these read-only rosapi queries are reused for a few seconds
+# ((service name, encoded args) -> (fetch time, response)).
+_GRAPH_CACHE: Dict[Tuple[str, bytes], Tuple[float, dict]] = {}
+_GRAPH_CACHE_TTL = 5.0
+_GRAPH_CACHE_SIZE = 1024
+_GRAPH_CACHE_LOCK = threading.Lock()
+
+
+def _cached_request(message: dict, ttl: float = _GRAPH_CACHE_TTL) -> Optional[dict]:
+    """
+    Send a read-only rosapi query, reusing a recent successful response to the same query.
+
+    Args:
+        message (dict): The call_service message (e.g. built from _TOPICS_TEMPLATE).
+        ttl (float): Maximum age in seconds of a reusable response. 0 always queries rosbridge
+            (the fresh answer still refreshes the cache for later callers).
+
+    Returns:
+        Optional[dict]: The rosbridge response, as returned by ws_manager.request.
+    """
+    key = (message["service"], dump_json(message.get("args", {})))
+    now = time.monotonic()
+    if ttl > 0:
+        with _GRAPH_CACHE_LOCK:
+            entry = _GRAPH_CACHE.get(key)
+            if entry is not None and now - entry[0] < ttl:
+                return copy.deepcopy(entry[1])
+
+    with ws_manager:
+        response = ws_manager.request(message)
+
+    # Only cache real answers; errors and timeouts are retried on the next call
+    if isinstance(response, dict) and response.get("result") is True:
+        with _GRAPH_CACHE_LOCK:
+            if len(_GRAPH_CACHE) >= _GRAPH_CACHE_SIZE:
+                # Drop expired entries; if everything is fresh, start over
+                for stale in [
+                    k for k, (t, _) in _GRAPH_CACHE.items() if now - t >= _GRAPH_CACHE_TTL
+                ]:
+                    del _GRAPH_CACHE[stale]
+                if len(_GRAPH_CACHE) >= _GRAPH_CACHE_SIZE:
+                    _GRAPH_CACHE.clear()
+            _GRAPH_CACHE[key] = (now, copy.deepcopy(response))
+    return response
+
+
+def _clear_graph_cache():
+    """Forget every cached graph query, e.g. after this server advertised or dropped a topic."""
+    with _GRAPH_CACHE_LOCK:
+        _GRAPH_CACHE.clear()
+
+
+def _advertise_topic(topic: str, msg_type: str) -> Optional[str]:
+    """
+    Advertise a topic on the shared connection, dropping cached graph queries if it is new.
+
+    Returns:
+        None if successful, or an error message string.
+    """
+    is_new = ws_manager.advertised.get(topic) != msg_type
+    send_error = ws_manager.advertise(topic, msg_type)
+    if is_new and not send_error:
+        _clear_graph_cache()  # topic lists and publishers now include this server
+    return send_error
 
 
 @mcp.tool(description=("Get robot configuration from YAML file."))
@@ -102,6 +255,11 @@ def connect_to_robot(
     # Set the IP and port
     ws_manager.set_ip(actual_ip, actual_port)
 
+    # Message definitions and the ROS graph may differ on the new robot
+    with _MSG_DETAIL_LOCK:
+        _MSG_DETAIL_CACHE.clear()
+    _clear_graph_cache()
+
     # Test connectivity
     ping_result = ping_ip_and_port(actual_ip, actual_port, ping_timeout, port_timeout)
 
@@ -122,26 +280,19 @@ def get_topics() -> dict:
             or a message string if no topics are found.
     """
     # rosbridge service call to get topic list
-    message = {
-        "op": "call_service",
-        "service": "/rosapi/topics",
-        "type": "rosapi/Topics",
-        "id": "get_topics_request_1",
-    }
+    message = {**_TOPICS_TEMPLATE, "id": _mk_id("get_topics_request")}
 
-    # Request topic list from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    # Request topic list from rosbridge (or reuse a recent answer)
+    response = _cached_request(message)
 
     # Check for service response errors first
-    if response and "result" in response and not response["result"]:
-        # Service call failed - return error with details from values
-        error_msg = response.get("values", {}).get("message", "Service call failed")
-        return {"error": f"Service call failed: {error_msg}"}
+    values, error = _service_values(response)
+    if error:
+        return {"error": error}
 
     # Return topic info if present
-    if response and "values" in response:
-        return response["values"]
+    if values is not None:
+        return values
     else:
         return {"warning": "No topics found"}
 
@@ -161,31 +312,29 @@ def get_topic_type(topic: str) -> dict:
             or an error message if topic doesn't exist.
     """
     # Validate input
-    if not topic or not topic.strip():
+    if not topic or topic.isspace():
         return {"error": "Topic name cannot be empty"}
+    if not _ROS_NAME_RE.fullmatch(topic):
+        return {"error": f"Invalid ROS name: {topic!r}"}
 
     # rosbridge service call to get topic type
     message = {
-        "op": "call_service",
-        "service": "/rosapi/topic_type",
-        "type": "rosapi/TopicType",
+        **_TOPIC_TYPE_TEMPLATE,
         "args": {"topic": topic},
-        "id": f"get_topic_type_request_{topic.replace('/', '_')}",
+        "id": _mk_id("get_topic_type_request"),
     }
 
-    # Request topic type from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    # Request topic type from rosbridge (or reuse a recent answer)
+    response = _cached_request(message)
 
     # Check for service response errors first
-    if response and "result" in response and not response["result"]:
-        # Service call failed - return error with details from values
-        error_msg = response.get("values", {}).get("message", "Service call failed")
-        return {"error": f"Service call failed: {error_msg}"}
+    values, error = _service_values(response)
+    if error:
+        return {"error": error}
 
     # Return topic type if present
-    if response and "values" in response:
-        topic_type = response["values"].get("type", "")
+    if values is not None:
+        topic_type = values.get("type", "")
         if topic_type:
             return {"topic": topic, "type": topic_type}
         else:
@@ -213,16 +362,21 @@ def get_message_details(message_type: str) -> dict:
             or an error message if the message type doesn't exist.
     """
     # Validate input
-    if not message_type or not message_type.strip():
+    if not message_type or message_type.isspace():
         return {"error": "Message type cannot be empty"}
 
+    # Serve repeated lookups from the cache without a rosbridge round trip
+    with _MSG_DETAIL_LOCK:
+        cached = _MSG_DETAIL_CACHE.get(message_type)
+        if cached is not None:
+            _MSG_DETAIL_CACHE.move_to_end(message_type)
+            return copy.deepcopy(cached)
+
     # rosbridge service call to get message details
     message = {
-        "op": "call_service",
-        "service": "/rosapi/message_details",
-        "type": "rosapi/MessageDetails",
+        **_MESSAGE_DETAILS_TEMPLATE,
         "args": {"type": message_type},
-        "id": f"get_message_details_request_{message_type.replace('/', '_')}",
+        "id": _mk_id("get_message_details_request"),
     }
 
     # Request message details from rosbridge
@@ -230,35 +384,53 @@ def get_message_details(message_type: str) -> dict:
         response = ws_manager.request(message)
 
     # Check for service response errors first
-    if response and "result" in response and not response["result"]:
-        # Service call failed - return error with details from values
-        error_msg = response.get("values", {}).get("message", "Service call failed")
-        return {"error": f"Service call failed: {error_msg}"}
+    values, error = _service_values(response)
+    if error:
+        return {"error": error}
 
     # Return message structure if present
-    if response and "values" in response:
-        typedefs = response["values"].get("typedefs", [])
+    if values is not None:
+        typedefs = values.get("typedefs", [])
         if typedefs:
             # Parse the structure into a more readable format
-            structure = {}
-            for typedef in typedefs:
-                type_name = typedef.get("type", message_type)
-                field_names = typedef.get("fieldnames", [])
-                field_types = typedef.get("fieldtypes", [])
-
-                fields = {}
-                for name, ftype in zip(field_names, field_types):
-                    fields[name] = ftype
-
-                structure[type_name] = {"fields": fields, "field_count": len(fields)}
+            structure = {
+                typedef.get("type", message_type): _typedef_to_fields(typedef)
+                for typedef in typedefs
+            }
 
-            return {"message_type": message_type, "structure": structure}
+            result = {"message_type": message_type, "structure": structure}
+            with _MSG_DETAIL_LOCK:
+                _MSG_DETAIL_CACHE[message_type] = copy.deepcopy(result)
+                if len(_MSG_DETAIL_CACHE) > _MSG_DETAIL_CACHE_SIZE:
+                    _MSG_DETAIL_CACHE.popitem(last=False)  # evict the least recently used
+            return result
         else:
             return {"error": f"Message type {message_type} not found or has no definition"}
     else:
         return {"error": f"Failed to get details for message type {message_type}"}
 
 
+@mcp.tool(
+    description=(
+        "Clear the cached message type definitions used by get_message_details.\n"
+        "Use this if message definitions on the robot have changed.\n"
+        "Example:\n"
+        "clear_message_cache()"
+    )
+)
+def clear_message_cache() -> dict:
+    """
+    Clear the cached message type definitions used by get_message_details.
+
+    Returns:
+        dict: Contains the number of cache entries that were removed.
+    """
+    with _MSG_DETAIL_LOCK:
+        cleared = len(_MSG_DETAIL_CACHE)
+        _MSG_DETAIL_CACHE.clear()
+    return {"success": True, "cleared_entries": cleared}
+
+
 @mcp.tool(
     description=(
         "Get list of nodes that are publishing to a specific topic.\n"
@@ -278,31 +450,29 @@ def get_publishers_for_topic(topic: str) -> dict:
             or a message if no publishers found.
     """
     # Validate input
-    if not topic or not topic.strip():
+    if not topic or topic.isspace():
         return {"error": "Topic name cannot be empty"}
+    if not _ROS_NAME_RE.fullmatch(topic):
+        return {"error": f"Invalid ROS name: {topic!r}"}
 
     # rosbridge service call to get publishers
     message = {
-        "op": "call_service",
-        "service": "/rosapi/publishers",
-        "type": "rosapi/Publishers",
+        **_PUBLISHERS_TEMPLATE,
         "args": {"topic": topic},
-        "id": f"get_publishers_for_topic_request_{topic.replace('/', '_')}",
+        "id": _mk_id("get_publishers_for_topic_request"),
     }
 
-    # Request publishers from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    # Request publishers from rosbridge (or reuse a recent answer)
+    response = _cached_request(message)
 
     # Check for service response errors first
-    if response and "result" in response and not response["result"]:
-        # Service call failed - return error with details from values
-        error_msg = response.get("values", {}).get("message", "Service call failed")
-        return {"error": f"Service call failed: {error_msg}"}
+    values, error = _service_values(response)
+    if error:
+        return {"error": error}
 
     # Return publishers if present
-    if response and "values" in response:
-        publishers = response["values"].get("publishers", [])
+    if values is not None:
+        publishers = values.get("publishers", [])
         return {"topic": topic, "publishers": publishers, "publisher_count": len(publishers)}
     else:
         return {"error": f"Failed to get publishers for topic {topic}"}
@@ -327,31 +497,29 @@ def get_subscribers_for_topic(topic: str) -> dict:
             or a message if no subscribers found.
     """
     # Validate input
-    if not topic or not topic.strip():
+    if not topic or topic.isspace():
         return {"error": "Topic name cannot be empty"}
+    if not _ROS_NAME_RE.fullmatch(topic):
+        return {"error": f"Invalid ROS name: {topic!r}"}
 
     # rosbridge service call to get subscribers
     message = {
-        "op": "call_service",
-        "service": "/rosapi/subscribers",
-        "type": "rosapi/Subscribers",
+        **_SUBSCRIBERS_TEMPLATE,
         "args": {"topic": topic},
-        "id": f"get_subscribers_for_topic_request_{topic.replace('/', '_')}",
+        "id": _mk_id("get_subscribers_for_topic_request"),
     }
 
-    # Request subscribers from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    # Request subscribers from rosbridge (or reuse a recent answer)
+    response = _cached_request(message)
 
     # Check for service response errors first
-    if response and "result" in response and not response["result"]:
-        # Service call failed - return error with details from values
-        error_msg = response.get("values", {}).get("message", "Service call failed")
-        return {"error": f"Service call failed: {error_msg}"}
+    values, error = _service_values(response)
+    if error:
+        return {"error": error}
 
     # Return subscribers if present
-    if response and "values" in response:
-        subscribers = response["values"].get("subscribers", [])
+    if values is not None:
+        subscribers = values.get("subscribers", [])
         return {"topic": topic, "subscribers": subscribers, "subscriber_count": len(subscribers)}
     else:
         return {"error": f"Failed to get subscribers for topic {topic}"}
@@ -391,6 +559,8 @@ def subscribe_once(
     # Validate critical args before attempting subscription
     if not topic or not msg_type:
         return {"error": "Missing required arguments: topic and msg_type must be provided."}
+    if not _ROS_NAME_RE.fullmatch(topic):
+        return {"error": f"Invalid ROS name: {topic!r}"}
 
     # Validate optional parameters
     if queue_length is not None and (not isinstance(queue_length, int) or queue_length < 1):
@@ -401,9 +571,11 @@ def subscribe_once(
     ):
         return {"error": "throttle_rate_ms must be an integer ≥ 0"}
 
-    # Construct the rosbridge subscribe message
+    # Construct the rosbridge subscribe message; rosbridge echoes the id in any status error
+    subscribe_id = _mk_id("subscribe")
     subscribe_msg: dict = {
         "op": "subscribe",
+        "id": subscribe_id,
         "topic": topic,
         "type": msg_type,
     }
@@ -415,6 +587,10 @@ def subscribe_once(
     if throttle_rate_ms is not None:
         subscribe_msg["throttle_rate"] = throttle_rate_ms
 
+    if "Image" in msg_type:
+        # Receive images as CBOR so the pixel data arrives as raw bytes instead of base64 text
+        subscribe_msg["compression"] = "cbor"
+
     # Subscribe and wait for the first message
     with ws_manager:
         # Send subscription request
@@ -422,44 +598,42 @@ def subscribe_once(
         if send_error:
             return {"error": f"Failed to subscribe: {send_error}"}
 
-        # Use default timeout if none specified
-        actual_timeout = timeout if timeout is not None else ws_manager.default_timeout
-
-        # Loop until we receive the first message or timeout
-        end_time = time.time() + actual_timeout
-        while time.time() < end_time:
-            response = ws_manager.receive(timeout=0.5)  # non-blocking small timeout
-            if response is None:
-                continue  # idle timeout: no frame this tick
-
-            if "Image" in msg_type:
-                msg_data = parse_image(response)
-            else:
-                msg_data = parse_json(response)
-
-            if not msg_data:
-                continue  # non-JSON or empty
+        # Read frames as they arrive until the first message or the timeout (None = default).
+        # Every exit unsubscribes, so the subscription cannot keep streaming into later calls
+        may_match = topic_frame_filter(topic)
+        try:
+            for response in ws_manager.iter_frames(timeout):
+                if not may_match(response):
+                    continue  # frame for another topic: skip the full (image) parse
+
+                # Check for status errors from rosbridge; only those carrying our id are ours
+                status = parse_json(response) if b'"status"' in response else None
+                if status and status.get("op") == "status":
+                    if status.get("level") == "error" and status.get("id") == subscribe_id:
+                        return {"error": f"Rosbridge error: {status.get('msg', 'Unknown error')}"}
+                    continue  # status left over from another call
 
-            # Check for status errors from rosbridge
-            if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                return {"error": f"Rosbridge error: {msg_data.get('msg', 'Unknown error')}"}
-
-            # Check for the first published message
-            if msg_data.get("op") == "publish" and msg_data.get("topic") == topic:
-                # Unsubscribe before returning the message
-                unsubscribe_msg = {"op": "unsubscribe", "topic": topic}
-                ws_manager.send(unsubscribe_msg)
                 if "Image" in msg_type:
-                    return {
-                        "message": "Image received successfully and saved in the MCP server. Run the 'analyze_image' tool to analyze it"
-                    }
+                    msg_data = parse_image(response)
                 else:
-                    return {"msg": msg_data.get("msg", {})}
+                    msg_data = parse_json(response)
 
-        # Timeout - unsubscribe and return error
-        unsubscribe_msg = {"op": "unsubscribe", "topic": topic}
-        ws_manager.send(unsubscribe_msg)
-        return {"error": "Timeout waiting for message from topic"}
+                if not msg_data:
+                    continue  # non-JSON or empty
+
+                # Check for the first published message
+                if msg_data.get("op") == "publish" and msg_data.get("topic") == topic:
+                    if "Image" in msg_type:
+                        return {
+                            "message": "Image received successfully and saved in the MCP server. Run the 'analyze_image' tool to analyze it"
+                        }
+                    else:
+                        return {"msg": msg_data.get("msg", {})}
+
+            return {"error": "Timeout waiting for message from topic"}
+        finally:
+            unsubscribe_msg = {"op": "unsubscribe", "topic": topic}
+            ws_manager.send(unsubscribe_msg)
 
 
 @mcp.tool(
@@ -480,61 +654,39 @@ def publish_once(topic: str = "", msg_type: str = "", msg: dict = {}) -> dict:
 
     Returns:
         dict:
-            - {"success": True} if sent without errors
-            - {"error": "<error message>"} if connection/send failed
-            - If rosbridge responds (usually it doesn’t for publish), parsed JSON or error info
+            - {"success": True} if sent and rosbridge reported no error
+            - {"error": "<error message>"} if connection/send failed or rosbridge rejected it
     """
     # Validate critical args before attempting publish
     if not topic or not msg_type or msg == {}:
         return {
             "error": "Missing required arguments: topic, msg_type, and msg must all be provided."
         }
+    if not _ROS_NAME_RE.fullmatch(topic):
+        return {"error": f"Invalid ROS name: {topic!r}"}
 
-    # Use proper advertise → publish → unadvertise pattern
+    # Advertise once per connection; later publishes to the same topic reuse it
     with ws_manager:
-        # 1. Advertise the topic
-        advertise_msg = {"op": "advertise", "topic": topic, "type": msg_type}
-        send_error = ws_manager.send(advertise_msg)
+        # 1. Advertise the topic (no-op if already advertised with this type)
+        send_error = _advertise_topic(topic, msg_type)
         if send_error:
             return {"error": f"Failed to advertise topic: {send_error}"}
 
-        # Check for advertise response/errors
-        response = ws_manager.receive(timeout=1.0)
-        if response:
-            try:
-                msg_data = json.loads(response)
-                if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                    return {"error": f"Advertise failed: {msg_data.get('msg', 'Unknown error')}"}
-            except json.JSONDecodeError:
-                pass  # Non-JSON response is usually fine for advertise
-
         # 2. Publish the message
-        publish_msg = {"op": "publish", "topic": topic, "msg": msg}
+        publish_id = _mk_id("publish")
+        publish_msg = {"op": "publish", "id": publish_id, "topic": topic, "msg": msg}
         send_error = ws_manager.send(publish_msg)
         if send_error:
-            # Try to unadvertise even if publish failed
-            ws_manager.send({"op": "unadvertise", "topic": topic})
             return {"error": f"Failed to publish message: {send_error}"}
 
-        # Check for publish response/errors
-        response = ws_manager.receive(timeout=1.0)
-        if response:
-            try:
-                msg_data = json.loads(response)
-                if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                    # Unadvertise before returning error
-                    ws_manager.send({"op": "unadvertise", "topic": topic})
-                    return {"error": f"Publish failed: {msg_data.get('msg', 'Unknown error')}"}
-            except json.JSONDecodeError:
-                pass  # Non-JSON response is usually fine for publish
-
-        # 3. Unadvertise the topic
-        unadvertise_msg = {"op": "unadvertise", "topic": topic}
-        ws_manager.send(unadvertise_msg)
+        # Rosbridge only replies on error, with a status frame carrying the publish id
+        status_error = ws_manager.wait_status([publish_id]).get(publish_id)
+        if status_error:
+            return {"error": f"Publish failed: {status_error}"}
 
     return {
         "success": True,
-        "note": "Message published using advertise → publish → unadvertise pattern",
+        "note": "Message published; the topic stays advertised for later publishes",
     }
 
 
@@ -576,6 +728,8 @@ def subscribe_for_duration(
     # Validate critical args before subscribing
     if not topic or not msg_type:
         return {"error": "Missing required arguments: topic and msg_type must be provided."}
+    if not _ROS_NAME_RE.fullmatch(topic):
+        return {"error": f"Invalid ROS name: {topic!r}"}
 
     # Validate optional parameters
     if queue_length is not None and (not isinstance(queue_length, int) or queue_length < 1):
@@ -586,9 +740,11 @@ def subscribe_for_duration(
     ):
         return {"error": "throttle_rate_ms must be an integer ≥ 0"}
 
-    # Send subscription request
+    # Send subscription request; rosbridge echoes the id in any status error
+    subscribe_id = _mk_id("subscribe")
     subscribe_msg: dict = {
         "op": "subscribe",
+        "id": subscribe_id,
         "topic": topic,
         "type": msg_type,
     }
@@ -607,26 +763,29 @@ def subscribe_for_duration(
 
         collected_messages = []
         status_errors = []
-        end_time = time.time() + duration
+        may_match = topic_frame_filter(topic)
 
         # Loop until duration expires or we hit max_messages
-        while time.time() < end_time and len(collected_messages) < max_messages:
-            response = ws_manager.receive(timeout=0.5)  # non-blocking small timeout
-            if response is None:
-                continue  # idle timeout: no frame this tick
+        frames = ws_manager.iter_frames(duration) if max_messages > 0 else ()
+        for response in frames:
+            if not may_match(response):
+                continue  # frame for another topic: skip the full parse
 
             msg_data = parse_json(response)
             if not msg_data:
                 continue  # non-JSON or empty
 
-            # Check for status errors from rosbridge
-            if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                status_errors.append(msg_data.get("msg", "Unknown error"))
+            # Check for status errors from rosbridge, skipping those left over from other calls
+            if msg_data.get("op") == "status":
+                if msg_data.get("level") == "error" and msg_data.get("id") == subscribe_id:
+                    status_errors.append(msg_data.get("msg", "Unknown error"))
                 continue
 
             # Check for published messages matching our topic
             if msg_data.get("op") == "publish" and msg_data.get("topic") == topic:
                 collected_messages.append(msg_data.get("msg", {}))
+                if len(collected_messages) >= max_messages:
+                    break
 
         # Unsubscribe when done
         unsubscribe_msg = {"op": "unsubscribe", "topic": topic}
@@ -677,73 +836,130 @@ def publish_for_durations(
         return {
             "error": "Missing required arguments: topic, msg_type, messages, and durations must all be provided."
         }
+    if not _ROS_NAME_RE.fullmatch(topic):
+        return {"error": f"Invalid ROS name: {topic!r}"}
 
     # Ensure same length for messages & durations
     if len(messages) != len(durations):
         return {"error": "messages and durations must have the same length"}
 
-    # Use proper advertise → publish → unadvertise pattern
+    # Serialize every frame up front so JSON encoding stays off the timing-critical path. Each
+    # frame carries its own id so a status error can be tied back to the message that caused it
+    frame_ids = [_mk_id("publish") for _ in messages]
+    try:
+        frames = [
+            dump_json({"op": "publish", "id": frame_id, "topic": topic, "msg": msg})
+            for frame_id, msg in zip(frame_ids, messages)
+        ]
+    except TypeError as e:
+        return {"error": f"Failed to serialize messages: {e}"}
+
+    # Messages due immediately (the first one plus any after zero durations) go out in one burst
+    lead = next((i for i, d in enumerate(durations) if d > 0), len(durations) - 1) + 1
+
+    # Advertise once per connection; later publishes to the same topic reuse it
     with ws_manager:
-        # 1. Advertise the topic
-        advertise_msg = {"op": "advertise", "topic": topic, "type": msg_type}
-        send_error = ws_manager.send(advertise_msg)
+        # 1. Advertise the topic (no-op if already advertised with this type). This waits for
+        # rosbridge's verdict, so it must not sit in the corked burst below
+        send_error = _advertise_topic(topic, msg_type)
         if send_error:
             return {"error": f"Failed to advertise topic: {send_error}"}
-
-        # Check for advertise response/errors
-        response = ws_manager.receive(timeout=1.0)
-        if response:
-            try:
-                msg_data = json.loads(response)
-                if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                    return {"error": f"Advertise failed: {msg_data.get('msg', 'Unknown error')}"}
-            except json.JSONDecodeError:
-                pass  # Non-JSON response is usually fine for advertise
-
-        published_count = 0
-        errors = []
-
-        # 2. Iterate and publish each message with a delay
-        for i, (msg, delay) in enumerate(zip(messages, durations)):
-            # Build the rosbridge publish message
-            publish_msg = {"op": "publish", "topic": topic, "msg": msg}
-
-            # Send it
-            send_error = ws_manager.send(publish_msg)
+        start = time.monotonic()  # the schedule counts from the first message going out
+        lead_failure = ws_manager.send_many(frames[:lead])  # one corked burst
+        # Frames of the burst before the failed one went out; those after it were never sent
+        failed_at, lead_error = lead_failure if lead_failure else (lead, None)
+
+        errors = {}  # message index -> error text
+        pending = {}  # id -> message index, for messages sent without a status error so far
+
+        last_sent_at = time.monotonic()  # the burst has just gone out
+        # Absolute deadlines: message i+1 is due durations[0] + ... + durations[i] after the start,
+        # so time spent sending does not accumulate as drift
+        deadlines = list(itertools.accumulate(durations, initial=start))
+
+        # 2. Iterate and publish each message on schedule
+        for i, frame in enumerate(frames):
+            if i >= lead:
+                send_error = ws_manager.send_bytes(frame)
+            elif i < failed_at:
+                send_error = None  # sent in the burst
+            elif i == failed_at:
+                send_error = lead_error
+            else:
+                send_error = "Not sent: an earlier message in the burst failed"
             if send_error:
-                errors.append(f"Message {i + 1}: {send_error}")
-                continue  # Continue with next message instead of failing completely
-
-            # Check for publish response/errors
-            response = ws_manager.receive(timeout=1.0)
-            if response:
-                try:
-                    msg_data = json.loads(response)
-                    if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                        errors.append(f"Message {i + 1}: {msg_data.get('msg', 'Unknown error')}")
-                        continue
-                except json.JSONDecodeError:
-                    pass  # Non-JSON response is usually fine for publish
-
-            published_count += 1
-
-            # Wait before sending the next message
-            time.sleep(delay)
-
-        # 3. Unadvertise the topic
-        unadvertise_msg = {"op": "unadvertise", "topic": topic}
-        ws_manager.send(unadvertise_msg)
+                errors[i] = send_error
+            else:
+                pending[frame_ids[i]] = i
+                last_sent_at = time.monotonic()
+
+            # Wait until the next message is due, collecting status errors for the messages
+            # sent so far; rosbridge only replies to a publish when it fails
+            remaining = deadlines[i + 1] - time.monotonic()
+            if remaining > 0 and pending:
+                for failed_id, status_error in ws_manager.wait_status(pending, remaining).items():
+                    errors[pending.pop(failed_id)] = status_error
+                remaining = deadlines[i + 1] - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)  # no sent message is left to hear back about
+
+        # Status frames trail their publish by a round trip, so give the last message sent the
+        # same bounded window as any other before returning (nothing to do if its duration
+        # already covered it). Unrelated frames stay queued for the next call
+        remaining = last_sent_at + ws_manager.status_timeout - time.monotonic()
+        if remaining > 0 and pending:
+            for failed_id, status_error in ws_manager.wait_status(pending, remaining).items():
+                errors[pending.pop(failed_id)] = status_error
 
     return {
         "success": True,
-        "published_count": published_count,
+        "published_count": len(messages) - len(errors),
         "total_messages": len(messages),
         "topic": topic,
         "msg_type": msg_type,
-        "errors": errors,  # Include any errors encountered during publishing
+        # Include any errors encountered during publishing
+        "errors": [f"Message {i + 1}: {error}" for i, error in sorted(errors.items())],
     }
 
 
+@mcp.tool(
+    description=(
+        "Stop advertising a topic that was published to with publish_once or publish_for_durations.\n"
+        "Example:\n"
+        "unadvertise_topic(topic='/cmd_vel')"
+    )
+)
+def unadvertise_topic(topic: str = "") -> dict:
+    """
+    Stop advertising a topic on the rosbridge connection.
+
+    Publishing keeps the topic advertised so that later publishes skip the advertise step.
+    This releases the advertisement explicitly; it is also dropped when the connection closes.
+
+    Args:
+        topic (str): ROS topic name (e.g., "/cmd_vel")
+
+    Returns:
+        dict:
+            - {"success": True, "topic": topic, "was_advertised": <bool>} if successful
+            - {"error": "<error message>"} if sending the unadvertise failed
+    """
+    if not topic:
+        return {"error": "Missing required argument: topic must be provided."}
+    if not _ROS_NAME_RE.fullmatch(topic):
+        return {"error": f"Invalid ROS name: {topic!r}"}
+
+    with ws_manager:
+        was_advertised = topic in ws_manager.advertised
+        send_error = ws_manager.unadvertise(topic)
+    if send_error:
+        return {"error": f"Failed to unadvertise topic: {send_error}"}
+    if was_advertised:
+        _clear_graph_cache()  # this server no longer publishes the topic
+
+    return {"success": True, "topic": topic, "was_advertised": was_advertised}
+
+
 ## ############################################################################################## ##
 ##
 ##                       ROS SERVICES
@@ -761,27 +977,19 @@ def get_services() -> dict:
             or a message string if no services are found.
     """
     # rosbridge service call to get service list
-    message = {
-        "op": "call_service",
-        "service": "/rosapi/services",
-        "type": "rosapi/Services",
-        "args": {},
-        "id": "get_services_request_1",
-    }
+    message = {**_SERVICES_TEMPLATE, "args": {}, "id": _mk_id("get_services_request")}
 
-    # Request service list from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    # Request service list from rosbridge (or reuse a recent answer)
+    response = _cached_request(message)
 
     # Check for service response errors first
-    if response and "result" in response and not response["result"]:
-        # Service call failed - return error with details from values
-        error_msg = response.get("values", {}).get("message", "Service call failed")
-        return {"error": f"Service call failed: {error_msg}"}
+    values, error = _service_values(response)
+    if error:
+        return {"error": error}
 
     # Return service info if present
-    if response and "values" in response:
-        services = response["values"].get("services", [])
+    if values is not None:
+        services = values.get("services", [])
         return {"services": services, "service_count": len(services)}
     else:
         return {"warning": "No services found"}
@@ -804,31 +1012,29 @@ def get_service_type(service: str) -> dict:
             or an error message if service doesn't exist.
     """
     # Validate input
-    if not service or not service.strip():
+    if not service or service.isspace():
         return {"error": "Service name cannot be empty"}
+    if not _ROS_NAME_RE.fullmatch(service):
+        return {"error": f"Invalid ROS name: {service!r}"}
 
     # rosbridge service call to get service type
     message = {
-        "op": "call_service",
-        "service": "/rosapi/service_type",
-        "type": "rosapi/ServiceType",
+        **_SERVICE_TYPE_TEMPLATE,
         "args": {"service": service},
-        "id": f"get_service_type_request_{service.replace('/', '_')}",
+        "id": _mk_id("get_service_type_request"),
     }
 
-    # Request service type from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    # Request service type from rosbridge (or reuse a recent answer)
+    response = _cached_request(message)
 
     # Check for service response errors first
-    if response and "result" in response and not response["result"]:
-        # Service call failed - return error with details from values
-        error_msg = response.get("values", {}).get("message", "Service call failed")
-        return {"error": f"Service call failed: {error_msg}"}
+    values, error = _service_values(response)
+    if error:
+        return {"error": error}
 
     # Return service type if present
-    if response and "values" in response:
-        service_type = response["values"].get("type", "")
+    if values is not None:
+        service_type = values.get("type", "")
         if service_type:
             return {"service": service, "type": service_type}
         else:
@@ -855,54 +1061,32 @@ def get_service_details(service_type: str) -> dict:
         dict: Contains complete service definition with request and response structures.
     """
     # Validate input
-    if not service_type or not service_type.strip():
+    if not service_type or service_type.isspace():
         return {"error": "Service type cannot be empty"}
 
     result = {"service_type": service_type, "request": {}, "response": {}}
 
-    # Get both request and response details in a single WebSocket context
-    with ws_manager:
-        # Get request details
-        request_message = {
-            "op": "call_service",
-            "service": "/rosapi/service_request_details",
-            "type": "rosapi/ServiceRequestDetails",
-            "args": {"type": service_type},
-            "id": f"get_service_details_request_{service_type.replace('/', '_')}",
-        }
+    request_message = {
+        **_SERVICE_REQUEST_DETAILS_TEMPLATE,
+        "args": {"type": service_type},
+        "id": _mk_id("get_service_details_request"),
+    }
+    response_message = {
+        **_SERVICE_RESPONSE_DETAILS_TEMPLATE,
+        "args": {"type": service_type},
+        "id": _mk_id("get_service_details_response"),
+    }
 
-        request_response = ws_manager.request(request_message)
-        if request_response and "values" in request_response:
-            typedefs = request_response["values"].get("typedefs", [])
-            if typedefs:
-                for typedef in typedefs:
-                    field_names = typedef.get("fieldnames", [])
-                    field_types = typedef.get("fieldtypes", [])
-                    fields = {}
-                    for name, ftype in zip(field_names, field_types):
-                        fields[name] = ftype
-                    result["request"] = {"fields": fields, "field_count": len(fields)}
-
-        # Get response details
-        response_message = {
-            "op": "call_service",
-            "service": "/rosapi/service_response_details",
-            "type": "rosapi/ServiceResponseDetails",
-            "args": {"type": service_type},
-            "id": f"get_service_details_response_{service_type.replace('/', '_')}",
-        }
+    # The two lookups are independent, so send both and collect the replies by id (one round trip)
+    with ws_manager:
+        responses = ws_manager.request_many([request_message, response_message])
 
-        response_response = ws_manager.request(response_message)
-        if response_response and "values" in response_response:
-            typedefs = response_response["values"].get("typedefs", [])
-            if typedefs:
-                for typedef in typedefs:
-                    field_names = typedef.get("fieldnames", [])
-                    field_types = typedef.get("fieldtypes", [])
-                    fields = {}
-                    for name, ftype in zip(field_names, field_types):
-                        fields[name] = ftype
-                    result["response"] = {"fields": fields, "field_count": len(fields)}
+    # Decode request and response details the same way; as before, the last typedef listed wins
+    for part, part_message in (("request", request_message), ("response", response_message)):
+        values, _ = _service_values(responses.get(part_message["id"]))
+        typedefs = values.get("typedefs", []) if values is not None else []
+        if typedefs:
+            result[part] = _typedef_to_fields(typedefs[-1])
 
     # Check if we got any data
     if not result["request"] and not result["response"]:
@@ -930,97 +1114,125 @@ def get_service_providers(service: str) -> dict:
             or an error message if service doesn't exist.
     """
     # Validate input
-    if not service or not service.strip():
+    if not service or service.isspace():
         return {"error": "Service name cannot be empty"}
+    if not _ROS_NAME_RE.fullmatch(service):
+        return {"error": f"Invalid ROS name: {service!r}"}
 
     # rosbridge service call to get service providers
     message = {
-        "op": "call_service",
-        "service": "/rosapi/service_providers",
-        "type": "rosapi/ServiceProviders",
+        **_SERVICE_PROVIDERS_TEMPLATE,
         "args": {"service": service},
-        "id": f"get_service_providers_request_{service.replace('/', '_')}",
+        "id": _mk_id("get_service_providers_request"),
     }
 
-    # Request service providers from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    # Request service providers from rosbridge (or reuse a recent answer)
+    response = _cached_request(message)
 
     # Return service providers if present
-    if response and "values" in response:
-        providers = response["values"].get("providers", [])
+    values, error = _service_values(response)
+    if values is not None:
+        providers = values.get("providers", [])
         return {"service": service, "providers": providers, "provider_count": len(providers)}
     else:
-        return {"error": f"Failed to get providers for service {service}"}
+        return {"error": error or f"Failed to get providers for service {service}"}
 
 
 @mcp.tool(
     description=(
         "Get comprehensive information about all services including types and providers.\n"
+        "Results are paginated; use offset/limit to page through large systems.\n"
         "Example:\n"
-        "inspect_all_services()"
+        "inspect_all_services()\n"
+        "inspect_all_services(offset=200, limit=200)  # Next page"
     )
 )
-def inspect_all_services() -> dict:
+def inspect_all_services(offset: int = 0, limit: int = 200) -> dict:
     """
     Get comprehensive information about all services including types and providers.
 
+    Args:
+        offset (int): Index of the first service to inspect. Must be ≥ 0.
+        limit (int): Maximum number of services to inspect. Must be ≥ 1.
+
     Returns:
-        dict: Contains detailed information about all services,
-            including service names, types, and provider nodes.
+        dict: Contains detailed information about the requested page of services,
+            including service names, types, and provider nodes, plus the offset,
+            limit, and total number of services.
     """
+    # Validate pagination
+    if not isinstance(offset, int) or offset < 0:
+        return {"error": "offset must be an integer ≥ 0"}
+    if not isinstance(limit, int) or limit < 1:
+        return {"error": "limit must be an integer ≥ 1"}
+
     # First get all services
     services_message = {
-        "op": "call_service",
-        "service": "/rosapi/services",
-        "type": "rosapi/Services",
+        **_SERVICES_TEMPLATE,
         "args": {},
-        "id": "inspect_all_services_request_1",
+        "id": _mk_id("inspect_all_services_request"),
     }
 
     with ws_manager:
-        services_response = ws_manager.request(services_message)
+        # The first page fetches a fresh list; following pages reuse it while it is recent, so
+        # quickly paging through the services costs one list fetch and sees a consistent listing
+        services_response = _cached_request(
+            services_message, ttl=0 if offset == 0 else _GRAPH_CACHE_TTL
+        )
 
-        if not services_response or "values" not in services_response:
-            return {"error": "Failed to get services list"}
+        services_values, error = _service_values(services_response)
+        if services_values is None:
+            return {"error": error or "Failed to get services list"}
+
+        services = services_values.get("services", [])
+
+        # Only inspect the requested page, so work and response size are bounded by limit
+        page = services[offset : offset + limit]
+
+        # Build the type and provider requests for every service on the page
+        type_messages = []
+        providers_messages = []
+        for service in page:
+            type_messages.append(
+                {
+                    **_SERVICE_TYPE_TEMPLATE,
+                    "args": {"service": service},
+                    "id": _mk_id("get_type"),
+                }
+            )
+            providers_messages.append(
+                {
+                    **_SERVICE_PROVIDERS_TEMPLATE,
+                    "args": {"service": service},
+                    "id": _mk_id("get_providers"),
+                }
+            )
+
+        # Send all requests in one burst and collect the responses by id
+        responses = ws_manager.request_many(type_messages + providers_messages)
 
-        services = services_response["values"].get("services", [])
         service_details = {}
-
-        # Get details for each service
         service_errors = []
-        for service in services:
-            # Get service type
-            type_message = {
-                "op": "call_service",
-                "service": "/rosapi/service_type",
-                "type": "rosapi/ServiceType",
-                "args": {"service": service},
-                "id": f"get_type_{service.replace('/', '_')}",
-            }
-
-            type_response = ws_manager.request(type_message)
+        for service, type_message, providers_message in zip(
+            page, type_messages, providers_messages
+        ):
+            type_response = responses.get(type_message["id"])
             service_type = ""
-            if type_response and "values" in type_response:
-                service_type = type_response["values"].get("type", "unknown")
-            elif type_response and "error" in type_response:
-                service_errors.append(f"Service {service}: {type_response['error']}")
-
-            # Get service providers
-            providers_message = {
-                "op": "call_service",
-                "service": "/rosapi/service_providers",
-                "type": "rosapi/ServiceProviders",
-                "args": {"service": service},
-                "id": f"get_providers_{service.replace('/', '_')}",
-            }
+            values, error = _service_values(type_response)
+            if values is not None:
+                service_type = values.get("type", "unknown")
+            elif error or (type_response and "error" in type_response):
+                service_errors.append(f"Service {service}: {error or type_response['error']}")
 
-            providers_response = ws_manager.request(providers_message)
+            providers_response = responses.get(providers_message["id"])
             providers = []
-            if providers_response and "values" in providers_response:
-                providers = providers_response["values"].get("providers", [])
-            elif providers_response and "error" in providers_response:
-                service_errors.append(f"Service {service} providers: {providers_response['error']}")
+            values, error = _service_values(providers_response)
+            if values is not None:
+                providers = values.get("providers", [])
+            elif error or (providers_response and "error" in providers_response):
+                service_errors.append(
+                    f"Service {service} providers: {error or providers_response['error']}"
+                )
 
             service_details[service] = {
                 "type": service_type,
@@ -1030,6 +1242,8 @@ def inspect_all_services() -> dict:
 
         return {
             "total_services": len(services),
+            "offset": offset,
+            "limit": limit,
             "services": service_details,
             "service_errors": service_errors,  # Include any errors encountered during inspection
         }
@@ -1058,13 +1272,19 @@ def call_service(
     Returns:
         dict: Contains the service response or error information.
     """
+    # Validate input before touching the connection
+    if not service_name or service_name.isspace():
+        return {"error": "Service name cannot be empty"}
+    if not _ROS_NAME_RE.fullmatch(service_name):
+        return {"error": f"Invalid ROS name: {service_name!r}"}
+
     # rosbridge service call
     message = {
         "op": "call_service",
         "service": service_name,
         "type": service_type,
         "args": request,
-        "id": f"call_service_request_{service_name.replace('/', '_')}",
+        "id": _mk_id("call_service_request"),
     }
 
     # Call the service through rosbridge
@@ -1072,14 +1292,13 @@ def call_service(
         response = ws_manager.request(message, timeout=timeout)
 
     # Check for service response errors first
-    if response and "result" in response and not response["result"]:
-        # Service call failed - return error with details from values
-        error_msg = response.get("values", {}).get("message", "Service call failed")
+    _, error = _service_values(response)
+    if error:
         return {
             "service": service_name,
             "service_type": service_type,
             "success": False,
-            "error": f"Service call failed: {error_msg}",
+            "error": error,
         }
 
     # Return service response if present
@@ -1171,7 +1390,15 @@ def analyze_previously_received_image():
     path = "./camera/received_image.jpeg"
     if not os.path.exists(path):
         return {"error": "No previously received image found at ./camera/received_image.jpeg"}
-    image = PILImage.open(path)
+    with open(path, "rb") as f:
+        img_bytes = f.read()
+    if img_bytes.startswith(b"\xff\xd8\xff"):
+        # Already JPEG (as written by parse_image): wrap the file as is, no decode/re-encode
+        return Image(data=img_bytes, format="jpeg").to_image_content()
+
+    from PIL import Image as PILImage  # deferred: only needed to convert other formats
+
+    image = PILImage.open(io.BytesIO(img_bytes))
     return _encode_image_to_imagecontent(image)
 
 
@@ -0,0 +1,66 @@
+"""Tests for the cached robot config loading in utils.config_utils."""
+
+import os
+
+import pytest
+import yaml
+
+from utils import config_utils
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Empty the config caches and record every YAML parse."""
+    parses = []
+    real_load = yaml.safe_load
+
+    def counting_load(stream):
+        parses.append(stream)
+        return real_load(stream)
+
+    monkeypatch.setattr(config_utils.yaml, "safe_load", counting_load)
+    monkeypatch.setattr(config_utils, "_ROBOT_CONFIG_CACHE", {})
+    monkeypatch.setattr(config_utils, "_ROBOT_SPECS_CACHE", {})
+    return parses
+
+
+@pytest.fixture
+def specs_dir(tmp_path, parses):
+    """A specification directory with one robot."""
+    (tmp_path / "bot.yaml").write_text("type: arm\nprompts: pick things up\n")
+    return tmp_path
+
+
+def test_config_is_parsed_once_while_the_file_is_unchanged(specs_dir, parses):
+    first = config_utils.load_robot_config("bot", str(specs_dir))
+    second = config_utils.load_robot_config("bot", str(specs_dir))
+
+    assert first == second == {"type": "arm", "prompts": "pick things up"}
+    assert len(parses) == 1
+
+
+def test_config_is_parsed_again_after_the_file_changes(specs_dir, parses):
+    path = specs_dir / "bot.yaml"
+    config_utils.load_robot_config("bot", str(specs_dir))
+    path.write_text("type: rover\nprompts: drive around\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))  # a distinct mtime
+
+    assert config_utils.load_robot_config("bot", str(specs_dir))["type"] == "rover"
+    assert len(parses) == 2
+
+
+def test_config_callers_get_copies(specs_dir):
+    config_utils.load_robot_config("bot", str(specs_dir))["type"] = "mutated"
+    assert config_utils.load_robot_config("bot", str(specs_dir))["type"] == "arm"
+
+
+def test_specification_listing_follows_the_directory(specs_dir):
+    assert config_utils.get_robot_specifications(str(specs_dir))["robot_specifications"] == ["bot"]
+
+    (specs_dir / "arm.yaml").write_text("type: arm\nprompts: x\n")
+    stat = specs_dir.stat()
+    os.utime(specs_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    listing = config_utils.get_robot_specifications(str(specs_dir))
+    assert listing == {"robot_specifications": ["arm", "bot"], "count": 2}
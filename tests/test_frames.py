@@ -0,0 +1,113 @@
+"""Tests for the raw frame helpers in utils.websocket_manager."""
+
+import base64
+
+import cbor2
+import orjson
+import pytest
+from PIL import Image
+
+from utils.websocket_manager import is_cbor_frame, parse_cbor, parse_image, topic_frame_filter
+
+
+def json_frame(message):
+    return orjson.dumps(message)
+
+
+@pytest.mark.parametrize(
+    "frame, expected",
+    [
+        (json_frame({"op": "publish", "topic": "/cmd_vel", "msg": {}}), True),
+        (json_frame({"msg": {}, "topic": "/cmd_vel", "op": "publish"}), True),  # any key order
+        (b'{"op": "publish", "topic": "/cmd_vel", "msg": {}}', True),  # any whitespace
+        (json_frame({"op": "status", "level": "error", "msg": "boom"}), True),
+        (json_frame({"op": "publish", "topic": "/chatter", "msg": {}}), False),
+        (
+            json_frame({"op": "publish", "topic": "/cmd_vel_raw", "msg": {}}),
+            False,
+        ),  # no prefix match
+        ('{"op": "publish", "topic": "/cmd_vel"}', True),  # str frames
+        ('{"op": "publish", "topic": "/chatter"}', False),
+        (cbor2.dumps({"op": "publish", "topic": "/cmd_vel", "msg": {}}), True),
+        (cbor2.dumps({"op": "publish", "topic": "/chatter", "msg": {}}), False),
+    ],
+)
+def test_topic_frame_filter(frame, expected):
+    assert topic_frame_filter("/cmd_vel")(frame) is expected
+
+
+@pytest.mark.parametrize(
+    "frame, expected",
+    [
+        (cbor2.dumps({"op": "publish"}), True),
+        (json_frame({"op": "publish"}), False),
+        ('{"op": "publish"}', False),  # str frames are always JSON
+        (cbor2.dumps([1, 2]), False),  # CBOR, but not a map
+        (b"", False),
+        (None, False),
+    ],
+)
+def test_is_cbor_frame(frame, expected):
+    assert is_cbor_frame(frame) is expected
+
+
+def test_parse_cbor():
+    message = {"op": "publish", "topic": "/image", "msg": {"data": b"\x00\x01"}}
+    assert parse_cbor(cbor2.dumps(message)) == message
+    assert parse_cbor(cbor2.dumps([1, 2])) is None  # not a dict
+    assert parse_cbor(b"\xbf") is None  # truncated map
+    assert parse_cbor(None) is None
+
+
+# (encoding, bytes of one pixel as sent, expected RGB colour or grey level after decoding)
+IMAGE_CASES = [
+    ("rgb8", bytes([200, 40, 10]), (200, 40, 10)),
+    ("bgr8", bytes([10, 40, 200]), (200, 40, 10)),
+    ("mono8", bytes([128]), 128),
+]
+
+
+def image_message(encoding, pixel, width=16, height=16, padding=5):
+    """An image message whose rows are padded with junk bytes past the last pixel."""
+    step = width * len(pixel) + padding
+    data = (pixel * width + b"\xff" * padding) * height
+    return {"height": height, "width": width, "encoding": encoding, "step": step, "data": data}
+
+
+def assert_saved_image(expected, width=16, height=16):
+    with Image.open("camera/received_image.jpeg") as image:
+        assert image.size == (width, height)
+        for y in (0, height // 2, height - 1):
+            pixel = image.getpixel((width - 1, y))  # last pixel of a row, next to the padding
+            values = pixel if isinstance(pixel, tuple) else (pixel,)
+            targets = expected if isinstance(expected, tuple) else (expected,)
+            assert all(abs(v - t) <= 8 for v, t in zip(values, targets))  # JPEG is lossy
+
+
+@pytest.mark.parametrize("encoding, pixel, expected", IMAGE_CASES)
+def test_parse_image_cbor_with_padded_rows(tmp_path, monkeypatch, encoding, pixel, expected):
+    monkeypatch.chdir(tmp_path)
+    frame = cbor2.dumps({"op": "publish", "topic": "/image", "msg": image_message(encoding, pixel)})
+
+    assert parse_image(frame)["msg"]["encoding"] == encoding
+    assert_saved_image(expected)
+
+
+@pytest.mark.parametrize("encoding, pixel, expected", IMAGE_CASES)
+def test_parse_image_json_with_padded_rows(tmp_path, monkeypatch, encoding, pixel, expected):
+    monkeypatch.chdir(tmp_path)
+    msg = image_message(encoding, pixel)
+    msg["data"] = base64.b64encode(msg["data"]).decode()
+    frame = json_frame({"op": "publish", "topic": "/image", "msg": msg})
+
+    assert parse_image(frame)["msg"]["encoding"] == encoding
+    assert_saved_image(expected)
+
+
+def test_parse_image_rejects_short_data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    msg = image_message("rgb8", bytes([1, 2, 3]))
+    msg["data"] = msg["data"][:-1]
+
+    assert parse_image(cbor2.dumps({"op": "publish", "msg": msg})) is None
+    assert not (tmp_path / "camera").exists()
@@ -0,0 +1,32 @@
+"""Tests for the connectivity checks in utils.network_utils."""
+
+import time
+
+from utils import network_utils
+
+
+def test_ping_and_port_check_run_concurrently(monkeypatch):
+    def slow_ping(ip, ping_timeout):
+        time.sleep(0.3)
+        return {"success": True, "error": None, "response_time_ms": 1.0}
+
+    def slow_port_check(ip, port, port_timeout):
+        time.sleep(0.3)
+        return {"open": True, "error": None}
+
+    monkeypatch.setattr(network_utils, "ping_ip", slow_ping)
+    monkeypatch.setattr(network_utils, "check_port", slow_port_check)
+
+    start = time.monotonic()
+    result = network_utils.ping_ip_and_port("127.0.0.1", 9090)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.5  # about max(ping, port check), not their sum
+    assert result["ping"]["success"] and result["port_check"]["open"]
+    assert result["overall_status"].startswith("Fully_accessible")
+
+
+def test_port_check_on_a_closed_port():
+    result = network_utils.check_port("127.0.0.1", 1, port_timeout=0.5)
+    assert result["open"] is False
+    assert result["error"]
@@ -0,0 +1,311 @@
+"""Tests for the helpers in server.py, with rosbridge replaced by fakes where one is needed."""
+
+import orjson
+import pytest
+
+import server
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["/cmd_vel", "cmd_vel", "/robot1/camera/image_raw", "~foo", "~/foo", "~/foo/bar", "_hidden"],
+)
+def test_ros_name_accepts_valid_names(name):
+    assert server._ROS_NAME_RE.fullmatch(name)
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "",
+        "/",
+        "//cmd_vel",
+        "/cmd_vel/",
+        "1topic",
+        "/cmd vel",
+        "/cmd-vel",
+        "~",
+        "~~foo",
+        "/~foo",
+        "/cmd_vel\n",
+    ],
+)
+def test_ros_name_rejects_invalid_names(name):
+    assert not server._ROS_NAME_RE.fullmatch(name)
+
+
+@pytest.fixture
+def graph_cache(monkeypatch):
+    """
+    Empty the graph cache and replace rosbridge with a counter of queries.
+
+    Yields a dict holding the fake clock ("now") and the number of requests sent ("calls").
+    Set "result" to control the fake rosapi answer.
+    """
+    state = {"now": 100.0, "calls": 0, "result": True}
+
+    def fake_request(message, timeout=None):
+        state["calls"] += 1
+        return {"result": state["result"], "values": {"topics": ["/a"]}, "id": message["id"]}
+
+    server._clear_graph_cache()
+    monkeypatch.setattr(server.ws_manager, "request", fake_request)
+    monkeypatch.setattr(server.time, "monotonic", lambda: state["now"])
+    yield state
+    server._clear_graph_cache()
+
+
+def topics_query():
+    return {**server._TOPICS_TEMPLATE, "id": server._mk_id("test")}
+
+
+def test_graph_cache_reuses_answers_until_the_ttl_expires(graph_cache):
+    server._cached_request(topics_query())
+    graph_cache["now"] += server._GRAPH_CACHE_TTL - 0.1
+    server._cached_request(topics_query())
+    assert graph_cache["calls"] == 1
+
+    graph_cache["now"] += 0.2
+    server._cached_request(topics_query())
+    assert graph_cache["calls"] == 2
+
+
+def test_graph_cache_skips_failed_answers(graph_cache):
+    graph_cache["result"] = False
+    server._cached_request(topics_query())
+    server._cached_request(topics_query())
+    assert graph_cache["calls"] == 2
+
+
+def test_graph_cache_hands_out_copies(graph_cache):
+    server._cached_request(topics_query())["values"]["topics"].append("/mutated")
+    cached = server._cached_request(topics_query())
+    cached["values"]["topics"].clear()
+
+    assert server._cached_request(topics_query())["values"]["topics"] == ["/a"]
+    assert graph_cache["calls"] == 1
+
+
+def test_graph_cache_ttl_zero_always_queries(graph_cache):
+    server._cached_request(topics_query())
+    server._cached_request(topics_query(), ttl=0)
+    assert graph_cache["calls"] == 2
+
+
+def test_advertising_a_new_topic_clears_the_graph_cache(graph_cache, monkeypatch):
+    def fake_advertise(topic, msg_type):
+        server.ws_manager.advertised[topic] = msg_type
+        return None
+
+    monkeypatch.setattr(server.ws_manager, "advertise", fake_advertise)
+    monkeypatch.setattr(server.ws_manager, "advertised", {})
+
+    server._cached_request(topics_query())
+    assert server._advertise_topic("/new", "std_msgs/msg/String") is None
+    server._cached_request(topics_query())
+    assert graph_cache["calls"] == 2  # the topic list was fetched again
+
+    server._advertise_topic("/new", "std_msgs/msg/String")  # already advertised: cache kept
+    server._cached_request(topics_query())
+    assert graph_cache["calls"] == 2
+
+
+def tool(name):
+    """The plain function behind an MCP tool."""
+    function = getattr(server, name)
+    return getattr(function, "fn", function)
+
+
+class FakeManager:
+    """Stands in for ws_manager in publish tests, on a fake clock that only moves when told."""
+
+    status_timeout = 0.3
+
+    def __init__(self, send_time=0.0):
+        self.now = 1000.0
+        self.send_time = send_time  # how long every send takes
+        self.advertised = {}
+        self.sent = []  # (time, message id) in send order
+        self.bursts = []  # number of frames per send_many call
+        self.status_errors = {}  # message id -> error rosbridge reports for it
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def advertise(self, topic, msg_type):
+        self.advertised[topic] = msg_type
+        return None
+
+    def send_bytes(self, payload):
+        self.sent.append((self.now, orjson.loads(payload)["id"]))
+        self.now += self.send_time
+        return None
+
+    def send_many(self, payloads):
+        self.bursts.append(len(payloads))
+        for payload in payloads:
+            self.send_bytes(payload)
+        return None
+
+    def wait_status(self, ids, timeout=None):
+        # Every error shows up at once; otherwise the wait lasts the whole timeout
+        errors = {i: self.status_errors[i] for i in ids if i in self.status_errors}
+        if not errors or len(errors) < len(list(ids)):
+            self.now += timeout if timeout is not None else self.status_timeout
+        return errors
+
+
+@pytest.fixture
+def fake_manager(monkeypatch):
+    manager = FakeManager()
+    monkeypatch.setattr(server, "ws_manager", manager)
+    monkeypatch.setattr(server.time, "monotonic", manager.monotonic)
+    monkeypatch.setattr(server.time, "sleep", manager.sleep)
+    return manager
+
+
+def publish(durations):
+    messages = [{"data": i} for i in range(len(durations))]
+    return tool("publish_for_durations")("/cmd_vel", "std_msgs/msg/Int32", messages, durations)
+
+
+def test_publish_for_durations_sends_messages_due_at_once_in_one_burst(fake_manager):
+    result = publish([0, 0, 1.0, 2.0])
+
+    assert fake_manager.bursts == [3]  # the first message and those after zero durations
+    assert [t - 1000.0 for t, _ in fake_manager.sent] == [0.0, 0.0, 0.0, 1.0]
+    assert result["published_count"] == 4
+
+
+def test_publish_for_durations_keeps_to_absolute_deadlines(fake_manager):
+    fake_manager.send_time = 0.25  # slow sends must not push the schedule back
+
+    publish([1.0, 1.0, 1.0, 1.0])
+
+    assert [t - 1000.0 for t, _ in fake_manager.sent] == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_publish_for_durations_attributes_status_errors_per_message(fake_manager):
+    original_send = fake_manager.send_bytes
+
+    def send_bytes(payload):
+        error = original_send(payload)
+        message_id = fake_manager.sent[-1][1]
+        if len(fake_manager.sent) in (2, 4):  # rosbridge rejects the 2nd and 4th publish
+            fake_manager.status_errors[message_id] = f"rejected {len(fake_manager.sent)}"
+        return error
+
+    fake_manager.send_bytes = send_bytes
+    result = publish([0, 0.5, 0.5, 0.5])
+
+    assert result["published_count"] == 2
+    assert result["errors"] == ["Message 2: rejected 2", "Message 4: rejected 4"]
+
+
+@pytest.fixture
+def message_details(monkeypatch):
+    """Empty the message detail cache and answer rosapi message_details queries locally."""
+    requested = []
+
+    def fake_request(message, timeout=None):
+        message_type = message["args"]["type"]
+        requested.append(message_type)
+        typedef = {"type": message_type, "fieldnames": ["data"], "fieldtypes": ["int32"]}
+        return {"result": True, "values": {"typedefs": [typedef]}, "id": message["id"]}
+
+    tool("clear_message_cache")()
+    monkeypatch.setattr(server.ws_manager, "request", fake_request)
+    yield requested
+    tool("clear_message_cache")()
+
+
+def test_message_details_are_cached(message_details):
+    first = tool("get_message_details")("std_msgs/msg/Int32")
+    first["structure"].clear()  # callers get copies
+    second = tool("get_message_details")("std_msgs/msg/Int32")
+
+    assert second["structure"] == {
+        "std_msgs/msg/Int32": {"fields": {"data": "int32"}, "field_count": 1}
+    }
+    assert message_details == ["std_msgs/msg/Int32"]
+
+
+def test_message_detail_cache_evicts_the_least_recently_used(message_details, monkeypatch):
+    monkeypatch.setattr(server, "_MSG_DETAIL_CACHE_SIZE", 2)
+    get_message_details = tool("get_message_details")
+
+    get_message_details("a/A")
+    get_message_details("b/B")
+    get_message_details("a/A")  # a/A is now the most recently used
+    get_message_details("c/C")  # evicts b/B
+    get_message_details("a/A")
+    get_message_details("b/B")
+
+    assert message_details == ["a/A", "b/B", "c/C", "b/B"]
+    assert tool("clear_message_cache")() == {"success": True, "cleared_entries": 2}
+
+
+@pytest.fixture
+def services(graph_cache, monkeypatch):
+    """Answer the services list from graph_cache and every per-service query in request_many."""
+    names = [f"/srv{i}" for i in range(5)]
+    listing_calls = []
+    batches = []
+
+    def fake_request(message, timeout=None):
+        listing_calls.append(message["service"])
+        return {"result": True, "values": {"services": names}, "id": message["id"]}
+
+    def fake_request_many(messages, timeout=None):
+        batches.append(len(messages))
+        results = {}
+        for message in messages:
+            service = message["args"]["service"]
+            if message["service"].endswith("service_type"):
+                values = {"type": f"pkg/{service[1:]}"}
+            else:
+                values = {"providers": [f"{service}_node"]}
+            results[message["id"]] = {"result": True, "values": values, "id": message["id"]}
+        return results
+
+    monkeypatch.setattr(server.ws_manager, "request", fake_request)
+    monkeypatch.setattr(server.ws_manager, "request_many", fake_request_many)
+    return {"listing_calls": listing_calls, "batches": batches}
+
+
+def test_inspect_all_services_returns_the_requested_page(services):
+    inspect_all_services = tool("inspect_all_services")
+
+    first = inspect_all_services(offset=0, limit=2)
+    second = inspect_all_services(offset=2, limit=2)
+    last = inspect_all_services(offset=4, limit=2)
+
+    assert list(first["services"]) == ["/srv0", "/srv1"]
+    assert list(second["services"]) == ["/srv2", "/srv3"]
+    assert last["services"] == {
+        "/srv4": {"type": "pkg/srv4", "providers": ["/srv4_node"], "provider_count": 1}
+    }
+    assert first["total_services"] == 5
+    assert services["batches"] == [4, 4, 2]  # type and providers per service, in one batch
+    assert len(services["listing_calls"]) == 1  # later pages reuse the fresh listing
+
+
+def test_inspect_all_services_first_page_refreshes_the_listing(services):
+    tool("inspect_all_services")(offset=0, limit=2)
+    tool("inspect_all_services")(offset=0, limit=2)
+    assert len(services["listing_calls"]) == 2
+
+
+def test_inspect_all_services_validates_pagination(services):
+    assert "error" in tool("inspect_all_services")(offset=-1)
+    assert "error" in tool("inspect_all_services")(limit=0)
+    assert services["listing_calls"] == []
@@ -0,0 +1,259 @@
+"""Tests for WebSocketManager against a minimal in-process fake rosbridge."""
+
+import json
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import pytest
+from websockets.sync import server as sync_server
+
+from utils.websocket_manager import WebSocketManager
+
+
+@pytest.fixture
+def rosbridge():
+    """
+    Start a fake rosbridge that runs the given handler for each connection.
+
+    Yields a function taking handler(connection) and an optional port, and returning a
+    WebSocketManager pointed at the server. The accepted connections are kept in
+    manager.connections and the server itself in manager.server.
+    """
+    servers = []
+
+    def start(handler, port=0):
+        connections = []
+
+        def on_connect(connection):
+            connections.append(connection)
+            handler(connection)
+
+        server = sync_server.serve(on_connect, "127.0.0.1", port)
+        servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        manager = WebSocketManager("127.0.0.1", server.socket.getsockname()[1], default_timeout=2.0)
+        manager.connections = connections
+        manager.server = server
+        return manager
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def reset(connection):
+    """Drop the connection at the TCP level, without a websocket close handshake."""
+    connection.socket.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    # shutdown() wakes the server's own reader thread, which then closes the socket
+    connection.socket.shutdown(socket.SHUT_RDWR)
+
+
+def test_request_returns_when_connection_drops_mid_wait(rosbridge):
+    def handler(connection):
+        connection.recv()
+        reset(connection)
+
+    manager = rosbridge(handler)
+    start = time.monotonic()
+    response = manager.request(
+        {"op": "call_service", "service": "/rosapi/topics", "id": "a"}, timeout=5.0
+    )
+    elapsed = time.monotonic() - start
+
+    assert response == {"error": "no response or timeout from rosbridge"}
+    assert elapsed < 2.0  # gave up on the lost connection instead of sitting out the timeout
+    assert manager.ws is None
+    assert len(manager.connections) == 2  # resent once on a fresh connection, then gave up
+
+
+def test_request_reconnects_after_rosbridge_restarts(rosbridge):
+    def handler(connection):
+        for raw in connection:
+            request = json.loads(raw)
+            connection.send(
+                json.dumps({"op": "service_response", "id": request["id"], "result": True})
+            )
+
+    manager = rosbridge(handler)
+    first = manager.request({"op": "call_service", "service": "/rosapi/topics", "id": "a"})
+    # rosbridge dies: its sockets close without a websocket close handshake
+    for connection in manager.connections:
+        reset(connection)
+    manager.server.shutdown()
+    restarted = rosbridge(handler, port=manager.port)
+    second = manager.request({"op": "call_service", "service": "/rosapi/topics", "id": "b"})
+    manager.close()
+
+    assert first["id"] == "a"
+    assert second["id"] == "b"
+    assert len(restarted.connections) == 1
+
+
+def test_send_reconnects_when_the_peer_closed_the_socket(rosbridge):
+    received = []
+
+    def handler(connection):
+        if not received:
+            connection.recv()
+            received.append("first")
+            reset(connection)
+            return
+        received.append(json.loads(connection.recv())["id"])
+        connection.recv()
+
+    manager = rosbridge(handler)
+    manager.send({"op": "publish", "id": "p1", "topic": "/chatter", "msg": {}})
+    time.sleep(0.2)  # let the reset reach the client
+    send_error = manager.send({"op": "publish", "id": "p2", "topic": "/chatter", "msg": {}})
+    time.sleep(0.2)
+    manager.close()
+
+    assert send_error is None
+    assert received == ["first", "p2"]
+
+
+def test_request_skips_frames_for_other_ids(rosbridge):
+    def handler(connection):
+        request = json.loads(connection.recv())
+        connection.send(json.dumps({"op": "status", "level": "error", "msg": "stale", "id": "old"}))
+        connection.send(json.dumps({"op": "publish", "topic": "/chatter", "msg": {"data": "hi"}}))
+        connection.send(json.dumps({"op": "service_response", "id": "other", "result": True}))
+        connection.send(
+            json.dumps({"op": "service_response", "id": request["id"], "values": {"topics": []}})
+        )
+        connection.recv()  # keep the connection open until the client closes it
+
+    manager = rosbridge(handler)
+    response = manager.request({"op": "call_service", "service": "/rosapi/topics", "id": "mine"})
+    manager.close()
+
+    assert response["id"] == "mine"
+    assert response["values"] == {"topics": []}
+
+
+def test_request_many_matches_out_of_order_responses(rosbridge):
+    def handler(connection):
+        requests = [json.loads(connection.recv()) for _ in range(3)]
+        for request in reversed(requests):
+            connection.send(
+                json.dumps(
+                    {"op": "service_response", "id": request["id"], "values": request["service"]}
+                )
+            )
+        connection.recv()
+
+    manager = rosbridge(handler)
+    messages = [{"op": "call_service", "service": f"/srv{i}", "id": f"r{i}"} for i in range(3)]
+    results = manager.request_many(messages)
+    manager.close()
+
+    assert {key: value["values"] for key, value in results.items()} == {
+        "r0": "/srv0",
+        "r1": "/srv1",
+        "r2": "/srv2",
+    }
+
+
+def test_request_many_reports_missing_responses(rosbridge):
+    def handler(connection):
+        requests = [json.loads(connection.recv()) for _ in range(2)]
+        connection.send(
+            json.dumps({"op": "service_response", "id": requests[1]["id"], "values": {}})
+        )
+        connection.recv()
+
+    manager = rosbridge(handler)
+    messages = [{"op": "call_service", "service": "/srv", "id": f"r{i}"} for i in range(2)]
+    results = manager.request_many(messages, timeout=0.5)
+    manager.close()
+
+    assert results["r0"] == {"error": "no response or timeout from rosbridge"}
+    assert results["r1"]["id"] == "r1"
+
+
+def test_advertise_is_recorded_only_when_rosbridge_accepts_it(rosbridge):
+    def handler(connection):
+        for raw in connection:
+            message = json.loads(raw)
+            if message["op"] == "advertise" and message["topic"] == "/bad":
+                connection.send(
+                    json.dumps(
+                        {"op": "status", "level": "error", "msg": "bad type", "id": message["id"]}
+                    )
+                )
+
+    manager = rosbridge(handler)
+    rejected = manager.advertise("/bad", "std_msgs/msg/Nope")
+    accepted = manager.advertise("/good", "std_msgs/msg/String")
+    manager.close()
+
+    assert rejected == "Rosbridge error: bad type"
+    assert accepted is None
+    assert manager.advertised == {"/good": "std_msgs/msg/String"}
+
+
+def test_wait_status_keeps_frames_it_does_not_own(rosbridge):
+    def handler(connection):
+        connection.recv()
+        connection.send(json.dumps({"op": "status", "level": "error", "msg": "old", "id": "x"}))
+        connection.send(json.dumps({"op": "publish", "topic": "/chatter", "msg": {"data": "hi"}}))
+        connection.send(json.dumps({"op": "status", "level": "error", "msg": "mine", "id": "p1"}))
+        connection.recv()
+
+    manager = rosbridge(handler)
+    manager.send({"op": "publish", "id": "p1", "topic": "/chatter", "msg": {}})
+    errors = manager.wait_status(["p1", "p2"], timeout=0.5)
+    leftovers = [json.loads(manager.receive(timeout=0)) for _ in range(2)]
+    manager.close()
+
+    assert errors == {"p1": "mine"}
+    assert [frame.get("id") for frame in leftovers] == ["x", None]
+
+
+def test_request_many_fails_only_the_message_that_cannot_be_serialized(rosbridge):
+    def handler(connection):
+        for raw in connection:
+            request = json.loads(raw)
+            connection.send(
+                json.dumps({"op": "service_response", "id": request["id"], "values": {}})
+            )
+
+    manager = rosbridge(handler)
+    messages = [
+        {"op": "call_service", "service": "/srv", "id": "ok1"},
+        {"op": "call_service", "service": "/srv", "id": "bad", "args": {"x": object()}},
+        {"op": "call_service", "service": "/srv", "id": "ok2"},
+    ]
+    results = manager.request_many(messages)
+    manager.close()
+
+    assert results["bad"]["error"].startswith("[WebSocket] JSON serialization error")
+    assert results["ok1"]["id"] == "ok1"
+    assert results["ok2"]["id"] == "ok2"
+
+
+def test_wait_status_counts_frames_pushed_out_of_a_full_backlog(rosbridge):
+    def handler(connection):
+        connection.recv()
+        for n in range(3):
+            connection.send(json.dumps({"op": "publish", "topic": "/chatter", "msg": {"n": n}}))
+        connection.send(json.dumps({"op": "status", "level": "error", "msg": "no", "id": "p1"}))
+        connection.recv()
+
+    manager = rosbridge(handler)
+    manager._backlog = deque(maxlen=2)
+    manager.send({"op": "publish", "id": "p1", "topic": "/chatter", "msg": {}})
+    assert manager.wait_status(["p1"], timeout=0.5) == {"p1": "no"}
+    backlog = list(manager._backlog)
+
+    # A later wait only reads new frames; the backlog is left as it was, not re-read
+    assert manager.wait_status(["p2"], timeout=0.1) == {}
+    assert list(manager._backlog) == backlog
+    leftovers = [json.loads(manager.receive(timeout=0))["msg"]["n"] for _ in range(2)]
+    manager.close()
+
+    assert manager.dropped_frames == 1
+    assert leftovers == [1, 2]  # the oldest frame was the one dropped
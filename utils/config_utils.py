@@ -1,12 +1,23 @@
+import copy
+import threading
 from pathlib import Path
 
 import yaml
 
+# Parsed YAML keyed by resolved path -> ((mtime_ns, size, inode), config).
+# A changed file gets a new signature and is re-parsed on the next load.
+_ROBOT_CONFIG_CACHE: dict = {}
+# Specification listings keyed by resolved directory -> (mtime_ns, result)
+_ROBOT_SPECS_CACHE: dict = {}
+_CACHE_LOCK = threading.Lock()
+
 
 def load_robot_config(robot_name: str, specs_dir: str) -> dict:
     """
     Load the robot configuration from a YAML file by robot name.
 
+    The parsed file is cached until its mtime, size, or inode changes.
+
     Args:
         robot_name (str): The name of the robot.
         specs_dir (str): Directory containing robot specification files.
@@ -22,8 +33,23 @@ def load_robot_config(robot_name: str, specs_dir: str) -> dict:
     if not file_path.exists():
         raise FileNotFoundError(f"Robot config file not found: {file_path}")
 
-    with file_path.open("r") as file:
-        return yaml.safe_load(file) or {}
+    stat = file_path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cache_key = str(file_path.resolve())
+
+    with _CACHE_LOCK:
+        cached = _ROBOT_CONFIG_CACHE.get(cache_key)
+
+    if cached is not None and cached[0] == signature:
+        config = cached[1]
+    else:
+        with file_path.open("r") as file:
+            config = yaml.safe_load(file) or {}
+        with _CACHE_LOCK:
+            _ROBOT_CONFIG_CACHE[cache_key] = (signature, config)
+
+    # Return a copy so callers cannot mutate the cached configuration
+    return copy.deepcopy(config)
 
 
 def parse_robot_config(name: str, specs_dir: str = "utils/robot_specifications") -> dict:
@@ -61,6 +87,8 @@ def get_robot_specifications(specs_dir: str = "utils/robot_specifications") -> d
     """
     Get a list of all available robot specification files.
 
+    The listing is cached until the directory's mtime changes (a file is added, removed, or renamed).
+
     Args:
         specs_dir (str): Directory containing robot specification files.
 
@@ -73,6 +101,13 @@ def get_robot_specifications(specs_dir: str = "utils/robot_specifications") -> d
         return {"error": f"Robot specifications directory not found: {specs_path}"}
 
     try:
+        dir_mtime = specs_path.stat().st_mtime_ns
+        cache_key = str(specs_path.resolve())
+        with _CACHE_LOCK:
+            cached = _ROBOT_SPECS_CACHE.get(cache_key)
+        if cached is not None and cached[0] == dir_mtime:
+            return copy.deepcopy(cached[1])
+
         # Find all YAML files in the specifications directory
         yaml_files = list(specs_path.glob("*.yaml"))
 
@@ -83,7 +118,10 @@ def get_robot_specifications(specs_dir: str = "utils/robot_specifications") -> d
         robot_names = [file.stem for file in yaml_files]
         robot_names.sort()  # Sort alphabetically for consistency
 
-        return {"robot_specifications": robot_names, "count": len(robot_names)}
+        result = {"robot_specifications": robot_names, "count": len(robot_names)}
+        with _CACHE_LOCK:
+            _ROBOT_SPECS_CACHE[cache_key] = (dir_mtime, result)
+        return copy.deepcopy(result)
 
     except Exception as e:
         return {"error": f"Failed to read robot specifications directory: {str(e)}"}
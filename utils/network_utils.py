@@ -1,33 +1,28 @@
+import atexit
 import platform
 import socket
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
 
+# Shared worker pool for the concurrent network checks, created once instead of per call
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ros-mcp")
+atexit.register(_EXECUTOR.shutdown, wait=False)
 
-def ping_ip_and_port(
-    ip: str, port: int, ping_timeout: float = 2.0, port_timeout: float = 2.0
-) -> Dict:
+
+def ping_ip(ip: str, ping_timeout: float = 2.0) -> Dict:
     """
-    Ping an IP address and check if a specific port is open.
+    Ping an IP address once.
 
     Args:
         ip (str): The IP address to ping (e.g., '192.168.1.100')
-        port (int): The port number to check (e.g., 9090)
         ping_timeout (float): Timeout for ping in seconds. Default = 2.0.
-        port_timeout (float): Timeout for port check in seconds. Default = 2.0.
 
     Returns:
-        dict: Contains ping and port check results with detailed status information.
+        dict: {"success": bool, "error": Optional[str], "response_time_ms": Optional[float]}
     """
-    result = {
-        "ip": ip,
-        "port": port,
-        "ping": {"success": False, "error": None, "response_time_ms": None},
-        "port_check": {"open": False, "error": None},
-        "overall_status": "unknown",
-    }
+    result = {"success": False, "error": None, "response_time_ms": None}
 
-    # Step 1: Ping the IP address
     try:
         # Use platform-specific ping command
         if platform.system().lower() == "windows":
@@ -48,23 +43,39 @@ def ping_ip_and_port(
                     if "time=" in line:
                         time_part = line.split("time=")[1].split()[0]
                         try:
-                            result["ping"]["response_time_ms"] = float(time_part)
+                            result["response_time_ms"] = float(time_part)
                         except ValueError:
-                            result["ping"]["response_time_ms"] = None
+                            result["response_time_ms"] = None
                     break
 
-            result["ping"]["success"] = True
+            result["success"] = True
         else:
-            result["ping"]["error"] = f"Ping failed with return code {ping_result.returncode}"
+            result["error"] = f"Ping failed with return code {ping_result.returncode}"
 
     except subprocess.TimeoutExpired:
-        result["ping"]["error"] = f"Ping timeout after {ping_timeout} seconds"
+        result["error"] = f"Ping timeout after {ping_timeout} seconds"
     except FileNotFoundError:
-        result["ping"]["error"] = "Ping command not found on this system"
+        result["error"] = "Ping command not found on this system"
     except Exception as e:
-        result["ping"]["error"] = f"Ping error: {str(e)}"
+        result["error"] = f"Ping error: {str(e)}"
+
+    return result
+
+
+def check_port(ip: str, port: int, port_timeout: float = 2.0) -> Dict:
+    """
+    Check if a TCP port is open on an IP address.
+
+    Args:
+        ip (str): The IP address to check (e.g., '192.168.1.100')
+        port (int): The port number to check (e.g., 9090)
+        port_timeout (float): Timeout for port check in seconds. Default = 2.0.
+
+    Returns:
+        dict: {"open": bool, "error": Optional[str]}
+    """
+    result = {"open": False, "error": None}
 
-    # Step 2: Check if port is open
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.settimeout(port_timeout)
@@ -73,20 +84,49 @@ def ping_ip_and_port(
         sock.close()
 
         if port_result == 0:
-            result["port_check"]["open"] = True
+            result["open"] = True
         else:
-            result["port_check"]["error"] = (
-                f"Port {port} is closed or unreachable (error code: {port_result})"
-            )
+            result["error"] = f"Port {port} is closed or unreachable (error code: {port_result})"
 
     except socket.timeout:
-        result["port_check"]["error"] = (
-            f"Port {port} connection timeout after {port_timeout} seconds"
-        )
+        result["error"] = f"Port {port} connection timeout after {port_timeout} seconds"
     except socket.gaierror as e:
-        result["port_check"]["error"] = f"DNS resolution error: {str(e)}"
+        result["error"] = f"DNS resolution error: {str(e)}"
     except Exception as e:
-        result["port_check"]["error"] = f"Port check error: {str(e)}"
+        result["error"] = f"Port check error: {str(e)}"
+
+    return result
+
+
+def ping_ip_and_port(
+    ip: str, port: int, ping_timeout: float = 2.0, port_timeout: float = 2.0
+) -> Dict:
+    """
+    Ping an IP address and check if a specific port is open.
+
+    Args:
+        ip (str): The IP address to ping (e.g., '192.168.1.100')
+        port (int): The port number to check (e.g., 9090)
+        ping_timeout (float): Timeout for ping in seconds. Default = 2.0.
+        port_timeout (float): Timeout for port check in seconds. Default = 2.0.
+
+    Returns:
+        dict: Contains ping and port check results with detailed status information.
+    """
+    result = {
+        "ip": ip,
+        "port": port,
+        "ping": {"success": False, "error": None, "response_time_ms": None},
+        "port_check": {"open": False, "error": None},
+        "overall_status": "unknown",
+    }
+
+    # Steps 1 & 2: ping and port check are independent, so run them concurrently.
+    # Wall time is max(ping_timeout, port_timeout) rather than their sum.
+    ping_future = _EXECUTOR.submit(ping_ip, ip, ping_timeout)
+    port_future = _EXECUTOR.submit(check_port, ip, port, port_timeout)
+    result["ping"] = ping_future.result()
+    result["port_check"] = port_future.result()
 
     # Step 3: Determine overall status
     ping_success = result["ping"]["success"]
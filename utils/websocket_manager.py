@@ -1,11 +1,16 @@
 import base64
-import json
+import itertools
 import os
+import select
+import socket
 import threading
-from typing import Optional, Union
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-import cv2
-import numpy as np
+import cbor2
+import orjson
 import websocket
 
 
@@ -21,21 +26,107 @@ def parse_json(raw: Optional[Union[str, bytes]]) -> Optional[dict]:
     """
     if raw is None:
         return None
-    if isinstance(raw, bytes):
-        raw = raw.decode("utf-8", errors="replace")
     try:
-        result = json.loads(raw)
+        # orjson parses str and bytes directly, without an intermediate decode
+        result = orjson.loads(raw)
         return result if isinstance(result, dict) else None
-    except (json.JSONDecodeError, TypeError):
+    except (orjson.JSONDecodeError, TypeError):
         return None
 
 
+def is_cbor_frame(raw: Optional[Union[str, bytes]]) -> bool:
+    """
+    Tell whether a raw frame is a CBOR-encoded rosbridge message.
+
+    Rosbridge sends messages for subscriptions with "compression": "cbor" as binary frames
+    holding a CBOR map. A CBOR map starts with a byte in 0xa0-0xbf, which can never start a
+    UTF-8 JSON document, so the first byte tells the two encodings apart.
+    """
+    return isinstance(raw, bytes) and len(raw) > 0 and 0xA0 <= raw[0] <= 0xBF
+
+
+def parse_cbor(raw: Optional[bytes]) -> Optional[dict]:
+    """
+    Safely parse a CBOR-encoded rosbridge message.
+
+    Args:
+        raw: CBOR bytes, or None
+
+    Returns:
+        Parsed dict if successful, None if raw is None, parsing fails, or result is not a dict
+    """
+    if raw is None:
+        return None
+    try:
+        result = cbor2.loads(raw)
+        return result if isinstance(result, dict) else None
+    except (cbor2.CBORDecodeError, TypeError):
+        return None
+
+
+def dump_json(message: dict) -> bytes:
+    """
+    Serialize a message to JSON for sending to rosbridge.
+
+    Args:
+        message: JSON-serializable dict
+
+    Returns:
+        UTF-8 encoded JSON, suitable as a WebSocket text frame payload
+
+    Raises:
+        TypeError: If the message is not JSON-serializable
+    """
+    return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
+
+
+def topic_frame_filter(topic: str) -> Callable[[Union[str, bytes]], bool]:
+    """
+    Build a cheap pre-filter for raw frames received while subscribed to a topic.
+
+    The returned predicate is a substring check on the undecoded frame. It is False only for
+    frames that can be neither a publish on the topic nor a status message, so those can be
+    dropped without a full JSON parse. Unlike a prefix check it does not depend on the key
+    order or whitespace rosbridge uses when serializing.
+
+    Args:
+        topic: The subscribed topic name
+
+    Returns:
+        Predicate taking a raw frame (str or bytes) and returning whether it may be relevant
+    """
+    topic_token = orjson.dumps(topic)  # the quoted topic, e.g. b'"/cmd_vel"'
+    status_token = b'"status"'
+    topic_text, status_text = topic_token.decode(), status_token.decode()
+    topic_bytes = topic.encode()  # CBOR frames hold strings unquoted
+
+    def may_match(raw: Union[str, bytes]) -> bool:
+        if isinstance(raw, str):
+            return topic_text in raw or status_text in raw
+        if is_cbor_frame(raw):
+            return topic_bytes in raw
+        return topic_token in raw or status_token in raw
+
+    return may_match
+
+
+# Pillow raw-decoder settings per ROS image encoding: (image mode, raw mode, bytes per pixel)
+_IMAGE_MODES = {
+    "rgb8": ("RGB", "RGB", 3),
+    "bgr8": ("RGB", "BGR", 3),
+    "mono8": ("L", "L", 1),
+}
+
+
 def parse_image(raw: Optional[Union[str, bytes]]) -> Optional[dict]:
     """
-    Decode a image message (json with base64 data) and save as PNG.
+    Decode a image message and save as JPEG.
+
+    Accepts both JSON frames (pixel data base64-encoded) and CBOR frames from a subscription
+    with "compression": "cbor" (pixel data as a raw byte string).
 
     Args:
-        raw: JSON string, bytes, or None
+        raw: JSON string, JSON or CBOR bytes, or None
 
     Returns:
         Parsed dict if successful, None if raw is None, parsing fails, or result is not a dict
@@ -44,66 +135,79 @@ def parse_image(raw: Optional[Union[str, bytes]]) -> Optional[dict]:
     if raw is None:
         return None
 
+    result = parse_cbor(raw) if is_cbor_frame(raw) else parse_json(raw)
     try:
-        result = json.loads(raw)
         msg = result["msg"]
-    except (json.JSONDecodeError, KeyError):
+    except (TypeError, KeyError):
         print("[Image] Invalid JSON or missing 'msg' field.")
         return None
 
     height, width, encoding = msg.get("height"), msg.get("width"), msg.get("encoding")
-    data_b64 = msg.get("data")
+    data = msg.get("data")
 
-    if not all([height, width, encoding, data_b64]):
+    if not all([height, width, encoding, data]):
         print("[Image] Missing required fields in message.")
         return None
 
-    # Decode base64 to numpy array
-    image_bytes = base64.b64decode(data_b64)
-    img_np = np.frombuffer(image_bytes, dtype=np.uint8)
-
-    # Encoding handlers
-    try:
-        if encoding == "rgb8":
-            img_cv = img_np.reshape((height, width, 3))
-            img_cv = cv2.cvtColor(img_cv, cv2.COLOR_RGB2BGR)
-        elif encoding == "bgr8":
-            img_cv = img_np.reshape((height, width, 3))
-        elif encoding == "mono8":
-            img_cv = img_np.reshape((height, width))
-        else:
-            print(f"[Image] Unsupported encoding: {encoding}")
-            return None
-    except ValueError as e:
-        print(f"[Image] Reshape error: {e}")
+    if encoding not in _IMAGE_MODES:
+        print(f"[Image] Unsupported encoding: {encoding}")
+        return None
+    image_mode, raw_mode, pixel_size = _IMAGE_MODES[encoding]
+
+    # Decode base64 once (CBOR frames already carry raw bytes); Pillow reads the pixels straight
+    # from these bytes, honouring the row stride, so no intermediate array or copy is needed
+    image_bytes = data if isinstance(data, bytes) else base64.b64decode(data)
+    step = msg.get("step") or width * pixel_size
+    if len(image_bytes) < step * height:
+        print(f"[Image] Expected {step * height} bytes of pixel data, got {len(image_bytes)}")
         return None
+    from PIL import Image as PILImage  # deferred: Pillow is only needed for image topics
 
-    if not os.path.exists("./camera"):
-        os.makedirs("./camera")
+    image = PILImage.frombuffer(image_mode, (width, height), image_bytes, "raw", raw_mode, step, 1)
 
-    success = cv2.imwrite(
-        "./camera/received_image.jpeg", img_cv, [cv2.IMWRITE_JPEG_QUALITY, 95]
-    )  # Save as JPEG with quality 95
-    if success:
-        return result if isinstance(result, dict) else None
-    else:
+    os.makedirs("./camera", exist_ok=True)
+    try:
+        image.save("./camera/received_image.jpeg", format="JPEG", quality=95)
+    except OSError as e:
+        print(f"[Image] Save error: {e}")
         return None
+    return result
 
 
 class WebSocketManager:
-    def __init__(self, ip: str, port: int, default_timeout: float = 2.0):
+    def __init__(
+        self, ip: str, port: int, default_timeout: float = 2.0, status_timeout: float = 0.3
+    ):
         self.ip = ip
         self.port = port
         self.default_timeout = default_timeout
+        # How long to wait for a status error after an advertise or publish; rosbridge only
+        # replies to those when they fail, about a round trip later
+        self.status_timeout = status_timeout
         self.ws = None
         self.lock = threading.RLock()
+        # Topics advertised on the current connection (topic -> msg_type). Rosbridge keeps an
+        # advertisement until the client unadvertises or disconnects.
+        self.advertised = {}
+        self._cork_depth = 0  # nesting level of corked() blocks
+        # Frames read by wait_status() that belong to someone else; receive() hands them out
+        # before reading the socket again. Bounded, so an unread backlog cannot grow forever;
+        # frames pushed out of a full backlog are counted in dropped_frames
+        self._backlog = deque(maxlen=256)
+        self.dropped_frames = 0
+        self._advertise_ids = itertools.count(1)
 
     def set_ip(self, ip: str, port: int):
         """
         Set the IP and port for the WebSocket connection.
+
+        An open connection to a different address is closed so the next call reconnects.
         """
-        self.ip = ip
-        self.port = port
+        with self.lock:
+            if (ip, port) != (self.ip, self.port):
+                self.close()
+            self.ip = ip
+            self.port = port
         print(f"[WebSocket] IP set to {self.ip}:{self.port}")
 
     def connect(self) -> Optional[str]:
@@ -118,7 +222,18 @@ class WebSocketManager:
             if self.ws is None or not self.ws.connected:
                 try:
                     url = f"ws://{self.ip}:{self.port}"
-                    self.ws = websocket.create_connection(url, timeout=self.default_timeout)
+                    self.ws = websocket.create_connection(
+                        url,
+                        timeout=self.default_timeout,
+                        # Rosbridge frames are small; send them immediately instead of waiting
+                        # on Nagle/delayed-ACK, and keep the idle persistent connection alive
+                        sockopt=(
+                            (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+                            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+                        ),
+                    )
+                    self.advertised = {}  # a new connection starts with no advertisements
+                    self._backlog.clear()
                     print(f"[WebSocket] Connected ({self.default_timeout}s timeout)")
                     return None  # no error
                 except Exception as e:
@@ -128,6 +243,34 @@ class WebSocketManager:
                     return error_msg
             return None  # already connected, no error
 
+    def ensure_connected(self) -> Optional[str]:
+        """
+        Make sure the persistent connection is usable, reconnecting if rosbridge went away.
+
+        ws.connected stays True after rosbridge restarts or resets the connection, until a send
+        or receive on it fails. A non-blocking peek at the socket finds a pending close or reset
+        before the next message is sent into it.
+
+        Returns:
+            None if connected,
+            or an error message string if reconnecting failed.
+        """
+        with self.lock:
+            if self.ws is not None and self.ws.connected and self._peer_closed():
+                print("[WebSocket] Connection closed by peer, reconnecting")
+                self.close()
+            return self.connect()
+
+    def _peer_closed(self) -> bool:
+        try:
+            readable, _, _ = select.select([self.ws.sock], [], [], 0)
+            if not readable:
+                return False  # idle and open
+            # Readable with nothing to read means the peer closed; pending frames are left intact
+            return self.ws.sock.recv(1, socket.MSG_PEEK) == b""
+        except (OSError, ValueError):
+            return True  # reset, or the socket is already closed
+
     def send(self, message: dict) -> Optional[str]:
         """
         Send a JSON-serializable message over WebSocket.
@@ -136,41 +279,107 @@ class WebSocketManager:
             None if successful,
             or an error message string if send failed.
         """
-        with self.lock:
-            conn_error = self.connect()
-            if conn_error:
-                return conn_error  # failed to connect
+        try:
+            json_msg = dump_json(message)  # ensure it's JSON-serializable
+        except TypeError as e:
+            error_msg = f"[WebSocket] JSON serialization error: {e}"
+            print(error_msg)
+            return error_msg
+        return self.send_bytes(json_msg)
+
+    def send_bytes(self, payload: Union[str, bytes]) -> Optional[str]:
+        """
+        Send an already serialized JSON message over WebSocket as a text frame.
 
-            if self.ws:
+        Returns:
+            None if successful,
+            or an error message string if send failed.
+        """
+        with self.lock:
+            error_msg = "[WebSocket] Not connected, send aborted."
+            # A send that fails on a stale socket is retried once on a fresh connection
+            for _ in range(2):
+                conn_error = self.ensure_connected()
+                if conn_error:
+                    return conn_error  # failed to connect
+
+                if not self.ws:
+                    break
                 try:
-                    json_msg = json.dumps(message)  # ensure it's JSON-serializable
-                    self.ws.send(json_msg)
+                    self.ws.send(payload)
                     return None  # no error
-                except TypeError as e:
-                    error_msg = f"[WebSocket] JSON serialization error: {e}"
-                    print(error_msg)
-                    self.close()
-                    return error_msg
                 except Exception as e:
                     error_msg = f"[WebSocket] Send error: {e}"
                     print(error_msg)
                     self.close()
-                    return error_msg
 
-            return "[WebSocket] Not connected, send aborted."
+            return error_msg
+
+    @contextmanager
+    def corked(self) -> Iterator[None]:
+        """
+        Hold back partial TCP segments while sending several frames back to back.
+
+        On Linux this sets TCP_CORK on the socket so the frames sent inside the block leave in as
+        few segments as possible; elsewhere it only holds the lock. Blocks may be nested.
+        """
+        with self.lock:
+            self._cork_depth += 1
+            if self._cork_depth == 1:
+                self._set_cork(True)
+            try:
+                yield
+            finally:
+                self._cork_depth -= 1
+                if self._cork_depth == 0:
+                    self._set_cork(False)  # flushes whatever is still queued
+
+    def _set_cork(self, enabled: bool):
+        cork = getattr(socket, "TCP_CORK", None)  # Linux only
+        if cork is None:
+            return
+        if not enabled and self.ws is None:
+            return
+        if enabled and self.ensure_connected():
+            return  # connect failed; the sends inside the block will report it
+        try:
+            self.ws.sock.setsockopt(socket.IPPROTO_TCP, cork, 1 if enabled else 0)
+        except (AttributeError, OSError):
+            pass  # best effort: sends still work uncorked
+
+    def send_many(self, payloads: List[Union[str, bytes]]) -> Optional[Tuple[int, str]]:
+        """
+        Send several already serialized JSON messages back to back in a single corked burst.
+
+        Returns:
+            None if successful,
+            or (index, error message) for the first payload whose send failed. Payloads before
+            that index were sent; later payloads are not sent.
+        """
+        with self.corked():
+            for index, payload in enumerate(payloads):
+                send_error = self.send_bytes(payload)
+                if send_error:
+                    return index, send_error
+            return None
 
-    def receive(self, timeout: Optional[float] = None) -> Optional[Union[str, bytes]]:
+    def receive(self, timeout: Optional[float] = None, use_backlog: bool = True) -> Optional[bytes]:
         """
         Receive a single message from rosbridge within the given timeout.
 
         Args:
             timeout (Optional[float]): Seconds to wait before timing out.
-                                     If None, uses the default timeout.
+                                     If None, uses the default timeout. 0 polls without blocking.
+            use_backlog (bool): Hand out frames put aside by wait_status() first.
+                                If False, only reads new frames from the socket.
 
         Returns:
-            Optional[str]: JSON string received from rosbridge, or None if timeout/error.
+            Optional[bytes]: Raw frame payload received from rosbridge, or None if timeout/error.
+                Payloads are left undecoded; parse_json and parse_image accept bytes directly.
         """
         with self.lock:
+            if use_backlog and self._backlog:
+                return self._backlog.popleft()  # frame put aside by wait_status()
             self.connect()
             if self.ws:
                 try:
@@ -178,14 +387,146 @@ class WebSocketManager:
                     actual_timeout = timeout if timeout is not None else self.default_timeout
                     # Temporarily set the receive timeout
                     self.ws.settimeout(actual_timeout)
-                    raw = self.ws.recv()  # rosbridge sends JSON as a string
-                    return raw
+                    # recv_data() skips the UTF-8 decode recv() does on every text frame
+                    opcode, raw = self.ws.recv_data()
+                    if opcode in (websocket.ABNF.OPCODE_TEXT, websocket.ABNF.OPCODE_BINARY):
+                        return raw
+                    if opcode == websocket.ABNF.OPCODE_CLOSE:
+                        self.close()
+                    return None
+                except (websocket.WebSocketTimeoutException, BlockingIOError):
+                    # No frame within the timeout; the connection itself is still healthy
+                    return None
                 except Exception as e:
                     print(f"[WebSocket] Receive error or timeout: {e}")
                     self.close()
                     return None
             return None
 
+    def iter_frames(
+        self, timeout: Optional[float] = None, use_backlog: bool = True
+    ) -> Iterator[bytes]:
+        """
+        Yield frames from rosbridge as soon as they arrive, until the timeout elapses.
+
+        Each receive waits only for the time remaining, so the loop neither wakes up on a fixed
+        tick nor overshoots the deadline. Stops early if the connection is lost.
+
+        Args:
+            timeout (Optional[float]): Total seconds to keep reading.
+                                     If None, uses the default timeout.
+            use_backlog (bool): Passed on to receive().
+
+        Yields:
+            bytes: Raw frame payloads, as returned by receive().
+        """
+        actual_timeout = timeout if timeout is not None else self.default_timeout
+        end_time = time.monotonic() + actual_timeout
+        with self.lock:
+            while True:
+                remaining = end_time - time.monotonic()
+                if remaining <= 0:
+                    return
+                raw = self.receive(timeout=remaining, use_backlog=use_backlog)
+                if raw is None:
+                    if self.ws is None:
+                        return  # connection lost; do not reconnect mid-wait
+                    continue  # timed out (ends the loop) or a control frame
+                yield raw
+
+    def wait_status(self, ids: Iterable[str], timeout: Optional[float] = None) -> Dict[str, str]:
+        """
+        Wait for rosbridge status errors about messages that get no reply when they succeed.
+
+        Rosbridge answers an advertise or publish only if it fails, with a status frame that
+        echoes the message id. Returns as soon as every id has reported an error, otherwise when
+        the timeout elapses. Frames for other ids or operations are kept for later receives.
+
+        Args:
+            ids (Iterable[str]): Ids of the messages to collect errors for.
+            timeout (Optional[float]): Seconds to wait. If None, uses status_timeout.
+
+        Returns:
+            Dict[str, str]: Maps the id of each failed message to rosbridge's error text.
+        """
+        pending = set(ids)
+        errors = {}
+        unrelated = []
+        actual_timeout = timeout if timeout is not None else self.status_timeout
+        with self.lock:
+            # Only new frames can answer: a status for an id is read after that id was sent, so
+            # every frame already in the backlog was checked against it and needs no re-parse
+            frames = self.iter_frames(actual_timeout, use_backlog=False) if pending else ()
+            for response in frames:
+                # Cheap substring reject: only status frames need to be parsed
+                msg_data = parse_json(response) if b'"status"' in response else None
+                status_id = (
+                    msg_data.get("id") if msg_data and msg_data.get("op") == "status" else None
+                )
+                if status_id not in pending:
+                    unrelated.append(response)
+                    continue
+                if msg_data.get("level") == "error":
+                    errors[status_id] = msg_data.get("msg", "Unknown error")
+                    pending.discard(status_id)
+                    if not pending:
+                        break
+            overflow = len(self._backlog) + len(unrelated) - self._backlog.maxlen
+            if overflow > 0:
+                self.dropped_frames += overflow
+                print(f"[WebSocket] Backlog full, dropped the {overflow} oldest unread frame(s)")
+            self._backlog.extend(unrelated)
+        return errors
+
+    def advertise(self, topic: str, msg_type: str) -> Optional[str]:
+        """
+        Advertise a topic on the current connection unless it already is.
+
+        Repeated publishes to the same topic reuse the advertisement instead of paying an
+        advertise/unadvertise exchange per call. The topic is only recorded as advertised
+        if rosbridge reports no error within status_timeout.
+
+        Returns:
+            None if successful,
+            or an error message string if the send failed or rosbridge rejected the advertise.
+        """
+        with self.lock:
+            conn_error = self.ensure_connected()  # a reconnect drops every advertisement
+            if conn_error:
+                return conn_error  # failed to connect
+
+            if self.advertised.get(topic) == msg_type:
+                return None  # already advertised with this type
+
+            if topic in self.advertised:
+                # Re-advertising with a different type requires dropping the old advertisement
+                self.unadvertise(topic)
+
+            advertise_id = f"advertise_{next(self._advertise_ids)}"
+            send_error = self.send(
+                {"op": "advertise", "id": advertise_id, "topic": topic, "type": msg_type}
+            )
+            if send_error:
+                return send_error
+            status_error = self.wait_status([advertise_id]).get(advertise_id)
+            if status_error:
+                return f"Rosbridge error: {status_error}"
+            self.advertised[topic] = msg_type
+            return None
+
+    def unadvertise(self, topic: str) -> Optional[str]:
+        """
+        Drop the advertisement for a topic so the next publish advertises it again.
+
+        Returns:
+            None if successful or the topic was not advertised,
+            or an error message string if send failed.
+        """
+        with self.lock:
+            if self.advertised.pop(topic, None) is None:
+                return None
+            return self.send({"op": "unadvertise", "topic": topic})
+
     def request(self, message: dict, timeout: Optional[float] = None) -> dict:
         """
         Send a request to Rosbridge and return the response.
@@ -201,40 +542,125 @@ class WebSocketManager:
                 - {"error": "<error message>"} if connection/send/receive fails.
                 - {"error": "invalid_json", "raw": <response>} if decoding fails.
         """
-        # Attempt to send the message (connect() is called internally in send())
-        send_error = self.send(message)
-        if send_error:
-            return {"error": send_error}
+        message_id = message.get("id")
+        # The quoted id, e.g. b'"get_topics_request_3"'; a reply must contain it verbatim
+        id_token = orjson.dumps(message_id) if message_id is not None else None
+        actual_timeout = timeout if timeout is not None else self.default_timeout
+        end_time = time.monotonic() + actual_timeout
+
+        with self.lock:
+            # If the connection drops before the reply, resend once on a fresh connection
+            for attempt in range(2):
+                # Attempt to send the message (ensure_connected() is called internally in send())
+                send_error = self.send(message)
+                if send_error:
+                    return {"error": send_error}
+
+                for response in self.iter_frames(end_time - time.monotonic()):
+                    # Cheap substring reject, so a stray frame (e.g. a late image publish) is
+                    # skipped without being parsed
+                    if id_token is not None and id_token not in response:
+                        continue
+
+                    # Attempt to parse JSON
+                    parsed_response = parse_json(response)
+                    if parsed_response is None:
+                        raw_text = response.decode("utf-8", errors="replace")
+                        print(f"[WebSocket] JSON decode error for response: {raw_text}")
+                        return {"error": "invalid_json", "raw": raw_text}
+
+                    # The connection is shared between calls, so skip frames left over from
+                    # earlier exchanges (e.g. late publishes from a finished subscription)
+                    if message_id is not None and parsed_response.get("id") != message_id:
+                        continue
+                    return parsed_response
+
+                if self.ws is not None or attempt or time.monotonic() >= end_time:
+                    break  # timed out on a live connection, or already resent once
+                print("[WebSocket] Connection lost while waiting for a response, resending")
 
-        # Attempt to receive a response (connect() is called internally in receive())
-        response = self.receive(timeout=timeout)
-        if response is None:
             return {"error": "no response or timeout from rosbridge"}
 
-        # Attempt to parse JSON
-        parsed_response = parse_json(response)
-        if parsed_response is None:
-            print(f"[WebSocket] JSON decode error for response: {response}")
-            return {"error": "invalid_json", "raw": response}
-        return parsed_response
+    def request_many(self, messages: list, timeout: Optional[float] = None) -> dict:
+        """
+        Send several requests to Rosbridge back-to-back and collect the responses by id.
+
+        Rosbridge echoes the id of each request in its response, so all requests can be in
+        flight at once instead of paying a full round trip per request.
+
+        Args:
+            messages (list): The Rosbridge message dictionaries to send. Each must have a unique "id".
+            timeout (Optional[float]): Seconds to wait for all responses.
+                                     If None, uses the default timeout.
+
+        Returns:
+            dict: Maps each message id to
+                - Parsed JSON response if successful.
+                - {"error": "<error message>"} if serializing or sending it fails, or no response arrives in time.
+        """
+        results = {}
+        pending = set()
+
+        # Serialize everything first, so a message that cannot be encoded fails on its own
+        # instead of being mistaken for a lost connection
+        payloads = []
+        for message in messages:
+            try:
+                payloads.append((message["id"], dump_json(message)))
+            except TypeError as e:
+                error_msg = f"[WebSocket] JSON serialization error: {e}"
+                print(error_msg)
+                results[message["id"]] = {"error": error_msg}
+
+        with self.lock:
+            # Send every request up front without waiting for responses
+            for index, (message_id, payload) in enumerate(payloads):
+                send_error = self.send_bytes(payload)
+                if send_error:
+                    # send_bytes already retried on a fresh connection, so the connection is
+                    # unusable and the remaining requests cannot be sent either
+                    for failed_id, _ in payloads[index:]:
+                        results[failed_id] = {"error": send_error}
+                    break
+                pending.add(message_id)
+
+            # Drain responses, dispatching each one by its id
+            if pending:
+                for response in self.iter_frames(timeout):
+                    parsed_response = parse_json(response)
+                    if parsed_response is None:
+                        continue
+                    response_id = parsed_response.get("id")
+                    if response_id in pending:
+                        pending.discard(response_id)
+                        results[response_id] = parsed_response
+                        if not pending:
+                            break
+
+        for response_id in pending:
+            results[response_id] = {"error": "no response or timeout from rosbridge"}
+        return results
 
     def close(self):
         with self.lock:
-            if self.ws and self.ws.connected:
-                try:
+            try:
+                if self.ws and self.ws.connected:
                     self.ws.close()
                     print("[WebSocket] Closed")
-                except Exception as e:
-                    print(f"[WebSocket] Close error: {e}")
-                finally:
-                    self.ws = None
+            except Exception as e:
+                print(f"[WebSocket] Close error: {e}")
+            finally:
+                # Also drop a socket the peer already reset (ws.connected is False by then), so
+                # iter_frames sees the lost connection instead of receive() reconnecting mid-wait
+                self.ws = None
 
     def __enter__(self):
-        """Context manager entry - automatically connects."""
+        """Context manager entry - reserves the shared connection for the caller."""
         # Don't connect here since we want to maintain the existing pattern
         # where request() handles connection automatically
+        self.lock.acquire()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit - automatically closes the connection."""
-        self.close()
+        """Context manager exit - releases the connection but keeps it open for reuse."""
+        self.lock.release()